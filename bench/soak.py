@@ -0,0 +1,362 @@
+"""Soak benchmark: replay a synthetic churning cluster for simulated days on
+wallboard mode and check that memory stays flat.
+
+Nothing is sent over network and nothing is drawn to terminal; responses come
+from :py:class:`SyntheticTransport` and the view is rendered into canvases.
+Alarms run on a simulated clock, so days pass in minutes.
+
+Run from the repository root; e.g. `python bench/soak.py --days 7 --apps 500`.
+Exit status is non-zero if memory grows after the first simulated day.
+"""
+import argparse
+import collections
+import gc
+import heapq
+import itertools
+import json
+import os
+import random
+import sys
+import time
+import typing
+import urllib.parse
+
+import httpcore
+
+# run from a checkout without installing hdtop
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import hdtop.auth
+import hdtop.config
+import hdtop.const
+import hdtop.latency
+import hdtop.main
+import hdtop.memory
+
+SYNTHETIC_URI = "http://synthetic-rm:8088"
+
+
+def setup_argparse():
+    """argparser for soak benchmark"""
+    parser = argparse.ArgumentParser(description="Soak benchmark of hdtop wallboard")
+    parser.add_argument(
+        "--days", type=float, default=3.0, help="Simulated duration in days"
+    )
+    parser.add_argument("--apps", type=int, default=300, help="Number of running apps")
+    parser.add_argument(
+        "--churn",
+        type=float,
+        default=0.05,
+        help="Fraction of apps that finish (and are replaced) on each poll",
+    )
+    parser.add_argument(
+        "--interval",
+        type=float,
+        default=60.0,
+        help="Simulated poll interval in seconds",
+    )
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=8.0,
+        help="Allowed RSS growth (MB) after the first simulated day",
+    )
+    parser.add_argument("--seed", type=int, default=0, help="Random seed")
+    return parser
+
+
+def main(argv: typing.List[str] = None) -> int:
+    """Entry point for soak benchmark."""
+    args = setup_argparse().parse_args(argv)
+
+    configs = hdtop.config.get_configs()
+    configs["core"]["queryInterval"] = args.interval
+    configs["apps"]["interpolateInterval"] = args.interval / 4
+    configs["apps"]["finishedTail"] = True
+    configs["rm"]["jmx"] = True
+    configs["wallboard"]["checkInterval"] = 3600.0
+
+    cluster = SyntheticCluster(args.apps, args.churn, args.seed)
+    hdtop.auth.set_client(
+        hdtop.latency.MeasuredClient(transport=SyntheticTransport(cluster))
+    )
+
+    display = hdtop.main.MainDisplay(wallboard=True)
+    loop = SimulatedLoop(cluster)
+    display.set_event(loop, SYNTHETIC_URI)
+
+    result = soak(display, loop, args.days * 86400, size=(160, 50))
+    print(result.report())
+
+    if result.growth > args.tolerance * (1 << 20):
+        print("Memory is not flat.", file=sys.stderr)
+        return 1
+    return 0
+
+
+class SyntheticCluster:
+    """Cluster whose apps keep finishing and being replaced; ids of new apps
+    are never reused, as on a real RM."""
+
+    USERS = tuple(f"user{i}" for i in range(20))
+    QUEUES = ("default", "etl", "adhoc", "ml", "streaming")
+    APP_TYPES = ("MAPREDUCE", "SPARK", "TEZ")
+
+    def __init__(self, num_apps: int, churn: float, seed: int = 0) -> None:
+        self.random = random.Random(seed)
+        self.num_apps = num_apps
+        self.churn = churn
+
+        # simulated clock; apps time is shifted from now, so it is always ahead
+        # of hdtop's watermark of finished apps
+        self.clock = 0.0
+        self.epoch = int(time.time() * 1000)
+        self.cluster_id = self.epoch // 1000
+        self._seq = itertools.count(1)
+
+        self.apps: typing.Dict[str, dict] = {}
+        self.finished: typing.Deque[dict] = collections.deque(maxlen=1000)
+        self.submitted = 0
+        for _ in range(num_apps):
+            self.submit()
+
+    @property
+    def now(self) -> int:
+        return self.epoch + int(self.clock * 1000)
+
+    def submit(self):
+        seq = next(self._seq)
+        app_id = f"application_{self.cluster_id}_{seq:04d}"
+        self.apps[app_id] = {
+            "id": app_id,
+            "user": self.random.choice(self.USERS),
+            "name": f"job-{seq}-" + "x" * self.random.randint(0, 40),
+            "queue": self.random.choice(self.QUEUES),
+            "state": "ACCEPTED",
+            "finalStatus": "UNDEFINED",
+            "progress": 0.0,
+            "applicationType": self.random.choice(self.APP_TYPES),
+            "applicationTags": "",
+            "priority": self.random.randint(0, 5),
+            "startedTime": self.now,
+            "elapsedTime": 0,
+            "allocatedMB": 0,
+            "allocatedVCores": 0,
+            "runningContainers": 0,
+            "memorySeconds": 0,
+            "vcoreSeconds": 0,
+            "queueUsagePercentage": 0.0,
+            "clusterUsagePercentage": 0.0,
+            "diagnostics": "",
+        }
+        self.submitted += 1
+
+    def advance(self, seconds: float):
+        self.clock += seconds
+        now = self.now
+
+        for app in self.apps.values():
+            app["elapsedTime"] = now - app["startedTime"]
+            if app["state"] == "ACCEPTED":
+                if self.random.random() < 0.5:
+                    app["state"] = "RUNNING"
+                continue
+
+            containers = self.random.randint(1, 50)
+            app["progress"] = min(app["progress"] + self.random.random() * 5, 99.9)
+            app["runningContainers"] = containers
+            app["allocatedMB"] = containers * 2048
+            app["allocatedVCores"] = containers
+            app["memorySeconds"] += int(containers * 2048 * seconds)
+            app["vcoreSeconds"] += int(containers * seconds)
+            app["queueUsagePercentage"] = round(self.random.random() * 10, 1)
+            app["clusterUsagePercentage"] = round(self.random.random() * 2, 1)
+
+        # finish some apps and replace them
+        count = max(1, int(self.num_apps * self.churn))
+        for app_id in self.random.sample(list(self.apps), count):
+            app = self.apps.pop(app_id)
+            app["state"] = "FINISHED"
+            app["finalStatus"] = self.random.choice(("SUCCEEDED",) * 8 + ("FAILED",))
+            app["finishedTime"] = now
+            app["progress"] = 100.0
+            self.finished.append(app)
+        for _ in range(count):
+            self.submit()
+
+    def get_metrics(self) -> dict:
+        running = sum(1 for app in self.apps.values() if app["state"] == "RUNNING")
+        containers = sum(app["runningContainers"] for app in self.apps.values())
+        return {
+            "clusterMetrics": {
+                "appsSubmitted": self.submitted,
+                "appsCompleted": self.submitted - len(self.apps),
+                "appsPending": len(self.apps) - running,
+                "appsRunning": running,
+                "allocatedMB": containers * 2048,
+                "totalMB": 1 << 24,
+                "allocatedVirtualCores": containers,
+                "totalVirtualCores": 1 << 13,
+                "containersAllocated": containers,
+                "totalNodes": 100,
+                "activeNodes": 100,
+            }
+        }
+
+    def get_apps(self, query: dict) -> dict:
+        if "finishedTimeBegin" in query:
+            begin = int(query["finishedTimeBegin"])
+            apps = [app for app in self.finished if app["finishedTime"] >= begin]
+        else:
+            apps = list(self.apps.values())
+        return {"apps": {"app": apps} if apps else None}
+
+    def get_jmx(self) -> dict:
+        return {
+            "beans": [
+                {
+                    "name": f"Hadoop:service=ResourceManager,name=RpcActivityForPort{port}",
+                    "RpcQueueTimeAvgTime": self.random.random(),
+                    "CallQueueLength": self.random.randint(0, 5),
+                }
+                for port in (8030, 8031, 8032, 8033)
+            ]
+        }
+
+
+class SyntheticTransport(httpcore.SyncHTTPTransport):
+    """Serve RM REST API from :py:class:`SyntheticCluster`."""
+
+    def __init__(self, cluster: SyntheticCluster) -> None:
+        self.cluster = cluster
+
+    def request(self, method, url, headers=None, stream=None, ext=None):
+        _, _, _, target = url
+        split = urllib.parse.urlsplit(target.decode())
+        query = dict(urllib.parse.parse_qsl(split.query))
+
+        if split.path == "/ws/v1/cluster/metrics":
+            status, body = 200, self.cluster.get_metrics()
+        elif split.path == "/ws/v1/cluster/apps":
+            status, body = 200, self.cluster.get_apps(query)
+        elif split.path == "/jmx":
+            status, body = 200, self.cluster.get_jmx()
+        else:
+            status, body = 404, {}
+
+        content = json.dumps(body).encode()
+        headers = [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(content)).encode()),
+        ]
+        return status, headers, httpcore.PlainByteStream(content), {}
+
+
+class SimulatedLoop:
+    """Stand-in of :py:class:`hdtop.render.FrameLimitedLoop` that runs alarms
+    on a simulated clock. The cluster is advanced along with the clock."""
+
+    def __init__(self, cluster: SyntheticCluster) -> None:
+        self.cluster = cluster
+        self.clock = 0.0
+        self.dirty = False
+        self._alarms = []
+        self._removed = set()
+        self._seq = itertools.count()
+
+    def set_alarm_in(self, sec, callback, user_data=None):
+        handle = (self.clock + sec, next(self._seq), callback, user_data)
+        heapq.heappush(self._alarms, handle)
+        return handle
+
+    def remove_alarm(self, handle):
+        self._removed.add(handle[1])
+        return True
+
+    def request_redraw(self):
+        self.dirty = True
+
+    def run_until(self, clock: float, on_frame: typing.Callable[[], None]):
+        """Run alarms due before `clock`. `on_frame` is called whenever redraw
+        is requested."""
+        while self._alarms and self._alarms[0][0] <= clock:
+            when, seq, callback, user_data = heapq.heappop(self._alarms)
+            if seq in self._removed:
+                self._removed.discard(seq)
+                continue
+
+            if when > self.clock:
+                self.cluster.advance(when - self.clock)
+                self.clock = when
+
+            callback(self, user_data)
+            if self.dirty:
+                self.dirty = False
+                on_frame()
+
+        if clock > self.clock:
+            self.cluster.advance(clock - self.clock)
+            self.clock = clock
+
+
+class SoakResult(typing.NamedTuple):
+    # (simulated seconds, rss, allocated blocks) on each checkpoint
+    samples: typing.List[typing.Tuple[float, int, int]]
+    baseline: int
+    growth: int
+    frames: int
+    elapsed: float
+
+    def report(self) -> str:
+        lines = ["   day       RSS   blocks"]
+        for clock, rss, blocks in self.samples:
+            lines.append(
+                "%6.2f %9s %8d" % (clock / 86400, hdtop.const.format_bytes(rss), blocks)
+            )
+        lines.append(
+            "RSS growth after warm-up: %s; %d frames in %.1fs"
+            % (hdtop.const.format_bytes(max(self.growth, 0)), self.frames, self.elapsed)
+        )
+        return "\n".join(lines)
+
+
+def soak(
+    display: "hdtop.main.MainDisplay",
+    loop: SimulatedLoop,
+    duration: float,
+    size: typing.Tuple[int, int],
+    checkpoint: float = 21600.0,
+    warm_up: float = 86400.0,
+) -> SoakResult:
+    """Run the display on the loop for `duration` simulated seconds.
+
+    Memory is sampled on each checkpoint after a full garbage collection.
+    Growth is the max RSS after `warm_up` minus the RSS at `warm_up`; the
+    warm-up lets caches and pools reach their capacity.
+    """
+    frames = 0
+
+    def on_frame():
+        nonlocal frames
+        frames += 1
+        display.view.render(size, focus=True)
+
+    started = time.monotonic()
+    samples = []
+    clock = 0.0
+    while clock < duration:
+        clock = min(clock + checkpoint, duration)
+        loop.run_until(clock, on_frame)
+
+        gc.collect()
+        samples.append((clock, hdtop.memory.get_rss() or 0, sys.getallocatedblocks()))
+
+    warm = [rss for t, rss, _ in samples if t >= min(warm_up, duration)]
+    baseline = warm[0] if warm else 0
+    growth = max(warm) - baseline if warm else 0
+
+    return SoakResult(samples, baseline, growth, frames, time.monotonic() - started)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,151 @@
+"""Bulk actions on apps: kill, move queue and change priority
+"""
+import concurrent.futures
+import logging
+import typing
+
+import httpx
+
+import hdtop.auth
+import hdtop.config
+
+logger = logging.getLogger("hdtop.actions")
+
+_executor = None
+
+
+class Action(typing.NamedTuple):
+    display_text: str
+    path: str
+    make_body: typing.Callable[[str], dict]
+
+
+def _priority(value: str) -> dict:
+    return {"priority": int(value)}
+
+
+ACTIONS = {
+    "kill": Action("Kill", "state", lambda value: {"state": "KILLED"}),
+    "queue": Action("Move", "queue", lambda value: {"queue": value}),
+    "priority": Action("Priority", "priority", _priority),
+}
+
+
+def get_executor() -> concurrent.futures.ThreadPoolExecutor:
+    """Get the worker pool. Its size bounds concurrent requests to RM."""
+    global _executor
+    if _executor is None:
+        _executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=hdtop.config.get_config("actions", "concurrency"),
+            thread_name_prefix="hdtop-action",
+        )
+    return _executor
+
+
+class BulkAction:
+    """Run one action on many apps.
+
+    Requests are sent from the worker pool over the shared HTTP client, so
+    connections are reused. Results are collected on the main loop by polling
+    :py:attr:`futures`; widgets are never touched from worker threads.
+    """
+
+    POLL_INTERVAL = 0.2
+
+    def __init__(
+        self, action: str, app_ids: typing.List[str], value: str = None
+    ) -> None:
+        """
+        Parameters
+        ----------
+            action : str
+                Key of :py:data:`ACTIONS`
+            app_ids : list
+                Apps to act on
+            value : str
+                Action argument; e.g. queue name
+
+        Raises
+        ------
+            ValueError
+                When the value is not valid for the action
+        """
+        self.action = ACTIONS[action]
+        self.app_ids = list(app_ids)
+        self.body = self.action.make_body(value)
+
+        self.futures: typing.Dict[concurrent.futures.Future, str] = {}
+        self.succeeded = 0
+        self.failed: typing.List[typing.Tuple[str, str]] = []
+        self.on_progress = None
+
+    @property
+    def finished(self) -> int:
+        return self.succeeded + len(self.failed)
+
+    @property
+    def done(self) -> bool:
+        return self.finished >= len(self.app_ids)
+
+    def start(
+        self,
+        loop: "hdtop.render.FrameLimitedLoop",
+        api_uri: str,
+        on_progress: typing.Callable[["BulkAction"], None],
+    ):
+        self.on_progress = on_progress
+        client = hdtop.auth.get_client()
+        executor = get_executor()
+        for app_id in self.app_ids:
+            uri = f"{api_uri}/ws/v1/cluster/apps/{app_id}/{self.action.path}"
+            future = executor.submit(self.request, client, uri)
+            self.futures[future] = app_id
+
+        loop.set_alarm_in(self.POLL_INTERVAL, self.poll)
+
+    def request(self, client: httpx.Client, uri: str):
+        resp = client.put(uri, json=self.body)
+        resp.raise_for_status()
+
+    def poll(self, loop, user_data):
+        completed = [future for future in self.futures if future.done()]
+        for future in completed:
+            app_id = self.futures.pop(future)
+            error = future.exception()
+            if error:
+                logger.warning(
+                    "%s %s failed: %s", self.action.display_text, app_id, error
+                )
+                self.failed.append((app_id, get_error_message(error)))
+            else:
+                self.succeeded += 1
+
+        if self.futures:
+            loop.set_alarm_in(self.POLL_INTERVAL, self.poll)
+        if completed or not self.futures:
+            self.on_progress(self)
+
+    def get_summary(self) -> list:
+        """Progress or result in markup."""
+        markup = [
+            ("footer", f" {self.action.display_text}: "),
+            ("footer key", f"{self.finished}/{len(self.app_ids)}"),
+            ("footer", " done" if self.done else " running"),
+        ]
+        if self.failed:
+            markup += [("footer", ", "), ("alert", f"{len(self.failed)} failed")]
+            if self.done:
+                app_id, message = self.failed[0]
+                markup += [("footer", f" ({app_id}: {message})")]
+        markup += [("footer", " ")]
+        return markup
+
+
+def get_error_message(error: Exception) -> str:
+    """Get message from RM's `RemoteException` response if possible."""
+    if isinstance(error, httpx.HTTPStatusError):
+        try:
+            return error.response.json()["RemoteException"]["message"]
+        except (ValueError, KeyError, TypeError):
+            return f"HTTP {error.response.status_code}"
+    return str(error) or type(error).__name__
@@ -0,0 +1,363 @@
+"""Alerting rules evaluated on each poll
+
+Rules are read from `[alert.<name>]` sections in the config file::
+
+    [alert.pending-containers]
+    on = cluster
+    when = containersPending > 100
+    for = 5m
+
+    [alert.long-running]
+    on = app
+    when = state == RUNNING and elapsedTime > 6h
+
+    [alert.queue-full]
+    on = queue
+    when = queue == etl and queueUsagePercentage >= 90
+    clear = 1m
+
+`on` is the target that the rule checks; one of `cluster` (clusterMetrics),
+`app` (each active app) or `queue` (apps grouped by queue, numbers summed).
+`when` is comparisons joined by `and` / `or` / `not` / parentheses. Numbers
+could have a time unit (`s`, `m`, `h`, `d`), which is converted to
+milliseconds as time fields in RM API are. `for` is how long the condition
+should hold before firing, and `clear` is how long it should be false before
+resolved.
+"""
+import collections
+import configparser
+import logging
+import os
+import re
+import shlex
+import subprocess
+import sys
+import time
+import typing
+
+import hdtop.config
+import hdtop.exception
+
+logger = logging.getLogger("hdtop.alert")
+
+TARGETS = ("cluster", "app", "queue")
+
+_TIME_UNITS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+
+_NAN = float("nan")
+
+_TOKENIZER = re.compile(
+    r"""
+    \s*(?:
+        (?P<number>-?\d+(?:\.\d+)?)(?P<unit>[smhd%]?)(?![\w.])
+        | (?P<string>"[^"]*"|'[^']*')
+        | (?P<operator>>=|<=|==|!=|>|<)
+        | (?P<paren>[()])
+        | (?P<word>[A-Za-z_][\w.\-]*)
+    )""",
+    re.VERBOSE,
+)
+
+
+class Rule(typing.NamedTuple):
+    name: str
+    target: str
+    expression: str
+    hold: float
+    clear: float
+
+
+class Alert(typing.NamedTuple):
+    rule: str
+    target: str
+    key: str
+    since: float
+
+
+class Transition(typing.NamedTuple):
+    alert: Alert
+    firing: bool
+
+
+def parse_duration(string: str) -> float:
+    """Parse duration string to seconds. e.g. `300`, `5m`, `1.5h`."""
+    value = string.strip()
+    scale = 1
+    if value[-1:] in _TIME_UNITS:
+        value, scale = value[:-1], _TIME_UNITS[value[-1:]]
+    try:
+        return float(value) * scale
+    except ValueError:
+        raise hdtop.exception.ConfigValueError(string)
+
+
+def translate(expression: str) -> str:
+    """Translate rule expression into python expression on dict `d`."""
+    tokens = []
+    pos = 0
+    expression = expression.strip()
+    while pos < len(expression):
+        match = _TOKENIZER.match(expression, pos)
+        if not match or match.end() == pos:
+            raise hdtop.exception.ConfigValueError(expression)
+        tokens.append(match)
+        pos = match.end()
+
+    output = []
+    depth = 0
+    expect = "operand"
+    field = operator = None
+
+    for token in tokens:
+        kind = token.lastgroup
+        if kind == "unit":
+            kind = "number"
+        text = token.group(kind)
+
+        if expect == "operand":
+            if kind == "paren" and text == "(":
+                depth += 1
+                output.append("(")
+            elif kind == "word" and text == "not":
+                output.append("not")
+            elif kind == "word" and text not in ("and", "or"):
+                field = text
+                expect = "operator"
+            else:
+                raise hdtop.exception.ConfigValueError(expression)
+
+        elif expect == "operator":
+            if kind != "operator":
+                raise hdtop.exception.ConfigValueError(expression)
+            operator = text
+            expect = "value"
+
+        elif expect == "value":
+            if kind == "number":
+                value = float(text)
+                unit = token.group("unit")
+                if unit in _TIME_UNITS:
+                    value *= _TIME_UNITS[unit] * 1000
+                output.append(f"number(d.get({field!r})) {operator} {value!r}")
+            elif kind in ("string", "word"):
+                if kind == "string":
+                    text = text[1:-1]
+                output.append(f"str(d.get({field!r})) {operator} {text!r}")
+            else:
+                raise hdtop.exception.ConfigValueError(expression)
+            expect = "conjunction"
+
+        elif expect == "conjunction":
+            if kind == "word" and text in ("and", "or"):
+                output.append(text)
+                expect = "operand"
+            elif kind == "paren" and text == ")" and depth > 0:
+                depth -= 1
+                output.append(")")
+            else:
+                raise hdtop.exception.ConfigValueError(expression)
+
+    if expect != "conjunction" or depth:
+        raise hdtop.exception.ConfigValueError(expression)
+
+    return " ".join(output)
+
+
+def to_number(value) -> float:
+    """Coerce field value for numeric comparison. Missing values count as 0;
+    non-numeric values become NaN, so any comparison but `!=` is false."""
+    if value is None:
+        return 0
+    if isinstance(value, (int, float)):
+        return value
+    return _NAN
+
+
+def compile_rules(rules: typing.List[Rule]) -> typing.Callable[[dict], tuple]:
+    """Compile rules into one function that returns a tuple of bools, one for
+    each rule. So evaluating many rules on an item is a single call."""
+    if not rules:
+        return lambda d: ()
+    source = "lambda d: (%s,)" % ", ".join(
+        "bool(%s)" % translate(rule.expression) for rule in rules
+    )
+    return eval(
+        compile(source, "<hdtop.alert>", "eval"),
+        {"__builtins__": {"str": str, "bool": bool}, "number": to_number},
+    )
+
+
+def load_rules() -> typing.List[Rule]:
+    """Read rules from config file."""
+    # no interpolation, as `%` is a unit in rule expressions
+    reader = configparser.ConfigParser(
+        interpolation=None, inline_comment_prefixes=(";", "#")
+    )
+    reader.read(hdtop.config.get_config_filename())
+
+    rules = []
+    for section in reader.sections():
+        if not section.startswith("alert."):
+            continue
+
+        name = section[6:]
+        target = reader.get(section, "on", fallback="cluster")
+        if target not in TARGETS:
+            raise hdtop.exception.ConfigValueError(f"{section}.on={target}", TARGETS)
+
+        expression = reader.get(section, "when", fallback=None)
+        if not expression:
+            filename = hdtop.config.get_config_filename()
+            raise hdtop.exception.ConfigValueError(
+                f"`when` is required in [{section}] of {filename}"
+            )
+
+        rule = Rule(
+            name=name,
+            target=target,
+            expression=expression,
+            hold=parse_duration(reader.get(section, "for", fallback="0")),
+            clear=parse_duration(reader.get(section, "clear", fallback="0")),
+        )
+        translate(rule.expression)  # validate
+        rules.append(rule)
+
+    return rules
+
+
+def group_by_queue(apps: typing.List[dict]) -> typing.Dict[str, dict]:
+    """Sum up numeric fields of apps in each queue."""
+    queues = {}
+    for app in apps:
+        name = app.get("queue", "")
+        queue = queues.get(name)
+        if queue is None:
+            queue = queues[name] = collections.Counter()
+        queue["apps"] += 1
+        for key, value in app.items():
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                queue[key] += value
+
+    result = {}
+    for name, queue in queues.items():
+        queue = dict(queue)
+        queue["queue"] = name
+        result[name] = queue
+    return result
+
+
+class AlertEngine:
+    """Evaluate rules against snapshots and keep alert states.
+
+    State is only kept for items that currently match or are still firing, so
+    memory is bounded by the number of hits rather than the number of items.
+    """
+
+    def __init__(self, rules: typing.List[Rule]) -> None:
+        self.rules = {target: [] for target in TARGETS}
+        for rule in rules:
+            self.rules[rule.target].append(rule)
+
+        self.predicates = {
+            target: compile_rules(rules) for target, rules in self.rules.items()
+        }
+
+        # (rule name, key) -> first time the condition is true / false
+        self._since_true = {}
+        self._since_false = {}
+        self.firing: typing.Dict[typing.Tuple[str, str], Alert] = {}
+
+    def __bool__(self) -> bool:
+        return any(self.rules.values())
+
+    def evaluate_cluster(self, metrics: dict) -> typing.List[Transition]:
+        return self.evaluate("cluster", {"cluster": metrics})
+
+    def evaluate_apps(self, apps: typing.List[dict]) -> typing.List[Transition]:
+        transitions = []
+        if self.rules["app"]:
+            transitions += self.evaluate("app", {app.get("id"): app for app in apps})
+        if self.rules["queue"]:
+            transitions += self.evaluate("queue", group_by_queue(apps))
+        return transitions
+
+    def evaluate(
+        self, target: str, items: typing.Dict[str, dict], now: float = None
+    ) -> typing.List[Transition]:
+        rules = self.rules[target]
+        if not rules:
+            return []
+
+        now = time.monotonic() if now is None else now
+        predicate = self.predicates[target]
+
+        # collect hits
+        hits = set()
+        for key, item in items.items():
+            for rule, hit in zip(rules, predicate(item)):
+                if hit:
+                    hits.add((rule.name, key))
+
+        names = {rule.name: rule for rule in rules}
+        transitions = []
+
+        # conditions hold
+        for state_key in hits:
+            since = self._since_true.setdefault(state_key, now)
+            self._since_false.pop(state_key, None)
+
+            rule = names[state_key[0]]
+            if state_key not in self.firing and now - since >= rule.hold:
+                alert = Alert(rule.name, target, state_key[1], since)
+                self.firing[state_key] = alert
+                transitions.append(Transition(alert, True))
+
+        # conditions no longer hold
+        for state_key in [k for k in self._since_true if k[0] in names]:
+            if state_key in hits:
+                continue
+            del self._since_true[state_key]
+            if state_key in self.firing:
+                self._since_false.setdefault(state_key, now)
+
+        for state_key in [k for k in self._since_false if k[0] in names]:
+            rule = names[state_key[0]]
+            if now - self._since_false[state_key] >= rule.clear:
+                del self._since_false[state_key]
+                alert = self.firing.pop(state_key)
+                transitions.append(Transition(alert, False))
+
+        return transitions
+
+    def firing_keys(self, target: str) -> typing.Set[str]:
+        return {alert.key for alert in self.firing.values() if alert.target == target}
+
+
+def format_transition(transition: Transition) -> str:
+    alert = transition.alert
+    state = "FIRING" if transition.firing else "RESOLVED"
+    timestamp = time.strftime("%Y-%m-%dT%H:%M:%S")
+    return f"{timestamp} {state} {alert.rule} {alert.target} {alert.key}"
+
+
+def emit(transition: Transition):
+    """Output alert transition on batch mode: print to stdout and run
+    `alerts.command` if set. Alert info is passed by environment variables."""
+    print(format_transition(transition), file=sys.stdout, flush=True)
+
+    command = hdtop.config.get_config("alerts", "command")
+    if not command:
+        return
+
+    alert = transition.alert
+    env = dict(os.environ)
+    env.update(
+        HDTOP_ALERT_RULE=alert.rule,
+        HDTOP_ALERT_TARGET=alert.target,
+        HDTOP_ALERT_KEY=str(alert.key),
+        HDTOP_ALERT_STATE="firing" if transition.firing else "resolved",
+    )
+    try:
+        subprocess.Popen(shlex.split(command), env=env)
+    except OSError:
+        logger.exception("Failed to run alert command")
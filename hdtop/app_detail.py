@@ -0,0 +1,212 @@
+"""Widgets for app detail (opened from app status)
+"""
+import collections
+import logging
+import time
+import typing
+
+import httpx
+import urwid
+
+import hdtop.apps_status
+import hdtop.config
+import hdtop.const
+
+logger = logging.getLogger("hdtop.app_detail")
+
+
+class ResponseCache:
+    """Small TTL cache for RM responses."""
+
+    def __init__(self, ttl: float, capacity: int = 64) -> None:
+        """
+        Parameters
+        ----------
+            ttl : float
+                Seconds before an entry expires
+            capacity : int
+                Max number of entries; the oldest one is dropped when exceed
+        """
+        self.ttl = ttl
+        self.capacity = capacity
+        self._entries = collections.OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key):
+        entry = self._entries.get(key)
+        if not entry:
+            return None
+
+        expire, value = entry
+        if expire < time.monotonic():
+            del self._entries[key]
+            return None
+
+        return value
+
+    def put(self, key, value):
+        self._entries.pop(key, None)
+        self._entries[key] = (time.monotonic() + self.ttl, value)
+        while len(self._entries) > self.capacity:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        self._entries.clear()
+
+    def expire(self):
+        """Drop all expired entries."""
+        now = time.monotonic()
+        for key in [k for k, (expire, _) in self._entries.items() if expire < now]:
+            del self._entries[key]
+
+
+class AppDetail(urwid.ListBox):
+    """Detail of single app, with its attempts and containers.
+
+    Data is fetched lazily: :py:meth:`show` only schedules a fetch after a
+    short delay, and a pending fetch is dropped once another app is shown. So
+    scrolling through the list does not leave a queue of stale requests.
+    """
+
+    FETCH_DELAY = 0.2
+
+    client: "httpx.Client"
+
+    def __init__(self) -> None:
+        super().__init__(urwid.SimpleListWalker([]))
+        self.cache = ResponseCache(hdtop.config.get_config("apps", "detailCacheTtl"))
+
+        # placeholder
+        self.uri = None
+        self.client = None
+        self.app_id = None
+        self._fetch_handle = None
+
+    def set_client(self, client: "httpx.Client", api_uri: str):
+        self.uri = api_uri + "/ws/v1/cluster/apps"
+        self.client = client
+
+    def show(self, loop: "hdtop.render.FrameLimitedLoop", app_id: str):
+        """Show detail of the app. Use cached data if possible."""
+        if app_id == self.app_id:
+            return
+
+        self.cancel(loop)
+        self.app_id = app_id
+
+        detail = self.cache.get(app_id)
+        if detail:
+            self.set_detail(detail)
+            return
+
+        self.set_note(f"Loading {app_id} ...")
+        self._fetch_handle = loop.set_alarm_in(self.FETCH_DELAY, self.fetch, app_id)
+
+    def cancel(self, loop: "hdtop.render.FrameLimitedLoop"):
+        """Drop pending fetch, if any."""
+        if self._fetch_handle:
+            loop.remove_alarm(self._fetch_handle)
+            self._fetch_handle = None
+        self.app_id = None
+
+    def fetch(self, loop, app_id):
+        self._fetch_handle = None
+        if app_id != self.app_id:
+            return
+
+        try:
+            detail = self.query(app_id)
+        except httpx.HTTPError:
+            logger.exception("Failed to query app detail")
+            self.set_note(f"Failed to query {app_id}")
+            loop.request_redraw()
+            return
+
+        self.cache.put(app_id, detail)
+        self.set_detail(detail)
+        loop.request_redraw()
+
+    def query(self, app_id: str) -> dict:
+        uri = f"{self.uri}/{app_id}"
+
+        resp = self.client.get(uri)
+        resp.raise_for_status()
+        app = resp.json().get("app", {})
+
+        resp = self.client.get(uri + "/appattempts")
+        resp.raise_for_status()
+        attempts = resp.json().get("appAttempts", {}).get("appAttempt", [])
+
+        # containers API is only available on hadoop 3+
+        containers = None
+        if attempts:
+            attempt_id = attempts[-1].get("appAttemptId")
+            try:
+                resp = self.client.get(f"{uri}/appattempts/{attempt_id}/containers")
+                resp.raise_for_status()
+                containers = resp.json().get("containers") or {}
+                containers = containers.get("container", [])
+            except httpx.HTTPStatusError:
+                pass
+
+        return {"app": app, "attempts": attempts, "containers": containers}
+
+    def set_note(self, text: str):
+        self.body[:] = [urwid.Text(("detail note", text))]
+
+    def set_detail(self, detail: dict):
+        app: dict = detail["app"]
+        widgets = [
+            urwid.Text(
+                [
+                    ("detail title", app.get("id", "")),
+                    ("detail value", "  " + app.get("name", "")),
+                ]
+            )
+        ]
+
+        for key, (display_text, formatter) in hdtop.const.HADOOP_APP_DETAIL.items():
+            value = app.get(key)
+            if not value:
+                continue
+            widgets.append(
+                urwid.Columns(
+                    [
+                        (14, urwid.Text(("detail key", display_text))),
+                        urwid.Text(("detail value", formatter(value))),
+                    ]
+                )
+            )
+
+        widgets += self.create_table(
+            "Attempts", hdtop.const.HADOOP_APP_ATTEMPT_INFO, detail["attempts"]
+        )
+        if detail["containers"] is not None:
+            widgets += self.create_table(
+                "Containers", hdtop.const.HADOOP_CONTAINER_INFO, detail["containers"]
+            )
+
+        self.body[:] = widgets
+
+    def create_table(
+        self, title: str, display_attr: dict, items: typing.List[dict]
+    ) -> typing.List[urwid.Widget]:
+        layout = hdtop.apps_status.ColumnLayout(display_attr)
+        header = hdtop.apps_status.HeaderRow(layout)
+        header.set_data(
+            {column: attr.display_text for column, attr in display_attr.items()}
+        )
+
+        widgets = [
+            urwid.Divider(),
+            urwid.Text(("detail title", f"{title} ({len(items)})")),
+            urwid.AttrWrap(header, "header"),
+        ]
+        for item in items:
+            row = hdtop.apps_status.Row(layout)
+            row.set_data(item)
+            widgets.append(row)
+
+        return widgets
@@ -1,22 +1,41 @@
 """Widgets for app status (lower pane)
 """
+import collections
 import logging
+import time
 import typing
 
 import httpx
 import urwid
+import urwid.canvas
+import urwid.text_layout
 import urwid.util
 
+import hdtop.app_detail
+import hdtop.auth
 import hdtop.config
 import hdtop.const
+import hdtop.snapshot
 
-logger = logging.getLogger("hdtop.cluster_metric")
+logger = logging.getLogger("hdtop.apps_status")
 
 
 class AppStatus(urwid.Frame):
+    signals = ["update", "delta", "select"]
+
+    # max number of row widgets kept for reuse
+    ROW_POOL_SIZE = 64
+
     text_attr: typing.Dict[str, hdtop.const._Attr]
 
-    def __init__(self) -> None:
+    def __init__(self, wallboard: bool = False) -> None:
+        """
+        Parameters
+        ----------
+            wallboard : bool
+                Read-only mode; keys are not handled, focus is not shown and
+                at most `wallboard.maxRows` apps are kept
+        """
         # load settings
         display_columns = [
             hdtop.config.get_config("apps", f"displayColumn.{idx}")
@@ -30,89 +49,546 @@ class AppStatus(urwid.Frame):
         }
 
         # view
-        self.header = HeaderRow(self.text_attr)
-        self.header.set_data(
+        self.layout = ColumnLayout(self.text_attr, pinned=1)
+        self.header_row = HeaderRow(self.layout)
+        self.header_row.set_data(
             {
                 column: hdtop.const.HADOOP_APP_INFO[column][0]
                 for column in display_columns
             }
         )
 
-        self.body = urwid.ListBox([])
+        self.listbox = urwid.ListBox([])
+        self.detail = hdtop.app_detail.AppDetail()
+        self.split = urwid.Pile(
+            [
+                ("weight", 1, self.listbox),
+                ("weight", 1, urwid.LineBox(self.detail)),
+            ]
+        )
         super().__init__(
-            header=urwid.AttrWrap(self.header, "header"),
-            body=self.body,
+            header=urwid.AttrWrap(self.header_row, "header"),
+            body=self.listbox,
         )
 
         # placeholder
         self.uri = None
         self.client = None
+        self.apps = None
+        self.loop = None
+        self.rows = []
+        self.highlight = set()
+        self.selected = set()
+        self.wallboard = wallboard
+        self.max_rows = hdtop.config.get_config("wallboard", "maxRows")
+        self.focus_attr = None if wallboard else "app info focus"
+        self.row_pool: typing.Deque[urwid.AttrMap] = collections.deque(
+            maxlen=self.ROW_POOL_SIZE
+        )
+        self.interpolator = Interpolator()
+        self.interpolate_columns = [
+            column for column in Interpolator.COLUMNS if column in self.text_attr
+        ]
 
-    def set_event(self, loop: "urwid.MainLoop", api_uri):
+        # elapsed time changes on every poll and is advanced by UI tick;
+        # excluded from diff. Progress is kept, as estimates fall back to the
+        # polled value when the rate is unknown
+        self.diff = hdtop.snapshot.SnapshotDiff(
+            column
+            for column in self.text_attr
+            if column != "elapsedTime" or not self.interpolating
+        )
+        self.row_widgets: typing.Dict[str, urwid.AttrMap] = {}
+        self.flash: typing.Dict[str, typing.Tuple[str, float]] = {}
+
+    def set_event(self, loop: "hdtop.render.FrameLimitedLoop", api_uri):
         self.uri = api_uri + "/ws/v1/cluster/apps"
         self.query = {"states": "NEW,NEW_SAVING,SUBMITTED,ACCEPTED,RUNNING"}
 
-        self.client = httpx.Client()
+        self.client = hdtop.auth.get_client()
+        self.detail.set_client(self.client, api_uri)
+        self.loop = loop
 
         loop.set_alarm_in(1.2, self.event)
+        if self.interpolating and self.interpolate_columns:
+            loop.set_alarm_in(1.2, self.interpolate)
+
+    @property
+    def interpolating(self) -> bool:
+        return hdtop.config.get_config("apps", "interpolateInterval") > 0
 
     def event(self, loop, user_data):
+        # schedule next query
+        loop.set_alarm_in(hdtop.config.get_config("core", "queryInterval"), self.event)
+
         # query
         try:
             resp = self.client.get(self.uri, params=self.query)
-        except httpx.HTTPError:
-            logger.exception("Failed to query cluster metric")
+        except httpx.HTTPError as e:
+            logger.warning("Failed to query apps: %s", e)
             return
 
         # update
-        apps = resp.json().get("apps", {})
-        if not apps:
-            return
+        all_apps = apps = (resp.json().get("apps") or {}).get("app", [])
+        if self.wallboard:
+            apps = apps[: self.max_rows]
+        self.interpolator.update(apps, time.monotonic())
+
+        delta = self.diff.update(apps)
+        if delta:
+            self.set_apps(apps, delta)
+            loop.request_redraw()
+            urwid.emit_signal(self, "delta", delta)
+        elif self.get_app_ids(apps) != self.get_app_ids(self.apps):
+            self.set_apps(apps, delta)
+            loop.request_redraw()
+        else:
+            # keep full records; selection filters may use hidden fields
+            self.apps = apps
+
+        urwid.emit_signal(self, "update", all_apps)
+
+    def set_apps(self, apps: typing.List[dict], delta: hdtop.snapshot.Delta):
+        """Update rows by delta; only new and changed rows are re-rendered."""
+        focused_id = self.get_focused_app_id()
+
+        # no flash on first snapshot
+        flash = self.apps is not None
+        expire = time.monotonic() + hdtop.config.get_config("apps", "flashDuration")
+
+        selected = len(self.selected)
+        for app in delta.removed:
+            row = self.row_widgets.pop(app.get("id"), None)
+            if row:
+                self.row_pool.append(row)
+            self.flash.pop(app.get("id"), None)
+            self.selected.discard(app.get("id"))
 
+        # reuse rows of removed apps; so churn does not allocate new widgets
+        for app in delta.added:
+            if self.row_pool:
+                row = self.row_pool.pop()
+            else:
+                row = urwid.AttrMap(Row(self.layout), "app info", self.focus_attr)
+            row.original_widget.set_data(app)
+            self.row_widgets[app.get("id")] = row
+            if flash:
+                self.flash[app.get("id")] = ("app info new", expire)
+
+        for app, _ in delta.changed:
+            self.row_widgets[app.get("id")].original_widget.set_data(app)
+            if app.get("id") not in self.flash:
+                self.flash[app.get("id")] = ("app info changed", expire)
+
+        # rebuild list in the order RM gives
         rows = []
-        for app in apps.get("app", []):
-            row = Row(self.text_attr)
-            row.set_data(app)
+        focus = 0
+        for idx, app in enumerate(apps):
+            row = self.row_widgets[app.get("id")]
+            self.set_row_attr(app.get("id"), row)
             rows.append(row)
+            if app.get("id") == focused_id:
+                focus = idx
 
-        self.body.body = rows
+        self.apps = apps
+        self.rows = rows
+        self.listbox.body = rows
+        if rows:
+            self.listbox.set_focus(focus)
 
-        # schedule next query
-        loop.set_alarm_in(hdtop.config.get_config("core", "queryInterval"), self.event)
+        if self.flash:
+            self.loop.set_alarm_in(
+                hdtop.config.get_config("apps", "flashDuration"), self.expire_flash
+            )
+
+        if len(self.selected) != selected:
+            urwid.emit_signal(self, "select", self.selected)
+
+    @staticmethod
+    def get_app_ids(apps: typing.Optional[typing.List[dict]]) -> typing.List[str]:
+        return [app.get("id") for app in apps or ()]
+
+    def interpolate(self, loop, user_data):
+        """UI tick; advance time-derived cells with estimated values."""
+        loop.set_alarm_in(
+            hdtop.config.get_config("apps", "interpolateInterval"), self.interpolate
+        )
+
+        now = time.monotonic()
+        changed = False
+        for app_id, row in self.row_widgets.items():
+            estimates = self.interpolator.estimate(app_id, now)
+            for column in self.interpolate_columns:
+                changed |= row.original_widget.set_estimate(
+                    column, estimates.get(column)
+                )
+
+        if changed:
+            loop.request_redraw()
+
+    def expire_flash(self, loop, user_data):
+        now = time.monotonic()
+        expired = [key for key, (_, expire) in self.flash.items() if expire <= now]
+        for app_id in expired:
+            del self.flash[app_id]
+            self.set_row_attr(app_id, self.row_widgets.get(app_id))
+        if expired:
+            loop.request_redraw()
+
+    def get_row_attr(self, app_id: str) -> str:
+        if app_id in self.selected:
+            return "app info selected"
+        if app_id in self.highlight:
+            return "app info warn"
+        if app_id in self.flash:
+            return self.flash[app_id][0]
+        return "app info"
+
+    def set_row_attr(self, app_id: str, row: typing.Optional[urwid.AttrMap]):
+        if not row:
+            return
+        attr = self.get_row_attr(app_id)
+        if row.attr_map.get(None) != attr:
+            row.set_attr_map({None: attr})
+            if self.wallboard:
+                return
+            if attr == "app info selected":
+                row.set_focus_map({None: "app info selected focus"})
+            else:
+                row.set_focus_map({None: "app info focus"})
+
+    def set_highlight(self, app_ids: typing.Set[str]) -> bool:
+        """Highlight rows of the given apps. Returns True if anything changed."""
+        if app_ids == self.highlight:
+            return False
+
+        self.highlight = app_ids
+        for app_id, row in self.row_widgets.items():
+            self.set_row_attr(app_id, row)
+        return True
+
+    def set_selected(self, app_ids: typing.Set[str]):
+        self.selected = app_ids
+        for app_id, row in self.row_widgets.items():
+            self.set_row_attr(app_id, row)
+        urwid.emit_signal(self, "select", self.selected)
+
+    def toggle_selected(self):
+        app_id = self.get_focused_app_id()
+        if app_id:
+            self.set_selected(self.selected ^ {app_id})
+
+    def select_where(self, predicate: typing.Callable[[dict], bool]) -> int:
+        """Add apps that match the predicate to selection. Returns number of
+        apps matched."""
+        matched = {app.get("id") for app in self.apps or () if predicate(app)}
+        self.set_selected(self.selected | matched)
+        return len(matched)
+
+    def get_targets(self) -> typing.List[str]:
+        """Apps to act on: selected ones, or the focused one if none selected."""
+        if self.selected:
+            return [
+                app.get("id") for app in self.apps if app.get("id") in self.selected
+            ]
+        app_id = self.get_focused_app_id()
+        return [app_id] if app_id else []
+
+    def get_focused_app(self) -> typing.Optional[dict]:
+        if not self.apps or not len(self.listbox.body):
+            return None
+        _, idx = self.listbox.get_focus()
+        if idx is None or idx >= len(self.apps):
+            return None
+        return self.apps[idx]
+
+    def get_focused_app_id(self) -> typing.Optional[str]:
+        app = self.get_focused_app()
+        return app.get("id") if app else None
+
+    @property
+    def detail_opened(self) -> bool:
+        return self.body is self.split
+
+    def open_detail(self):
+        app_id = self.get_focused_app_id()
+        if not app_id:
+            return
+        self.body = self.split
+        self.split.focus_position = 0
+        self.detail.show(self.loop, app_id)
+
+    def close_detail(self):
+        self.detail.cancel(self.loop)
+        self.body = self.listbox
+
+    def compact(self, aggressive: bool = False):
+        """Drop cached data that could be rebuilt."""
+        self.layout.compact()
+        self.detail.cache.expire()
+        if self.loop:
+            self.expire_flash(self.loop, None)
+        if aggressive:
+            self.detail.cache.clear()
+            self.row_pool.clear()
 
+    def keypress(self, size, key):
+        if self.wallboard:
+            return key
 
-class Row(urwid.Columns):
+        if key == "enter":
+            if self.detail_opened:
+                self.close_detail()
+            else:
+                self.open_detail()
+            return None
+
+        if key == "esc" and self.detail_opened:
+            self.close_detail()
+            return None
+
+        if key == "esc" and self.selected:
+            self.set_selected(set())
+            return None
+
+        if key == " ":
+            self.toggle_selected()
+            key = "down"
+
+        if key == "u":
+            app = self.get_focused_app()
+            if app:
+                self.select_where(lambda d: d.get("user") == app.get("user"))
+            return None
+
+        if key in ("left", "right"):
+            if self.layout.scroll(-1 if key == "left" else 1):
+                self.header_row._invalidate()
+                for row in self.row_widgets.values():
+                    row.original_widget._invalidate()
+            return None
+
+        key = super().keypress(size, key)
+
+        if self.detail_opened:
+            app_id = self.get_focused_app_id()
+            if app_id:
+                self.detail.show(self.loop, app_id)
+
+        return key
+
+
+class ColumnLayout:
+    """Visible columns and their widths of a table.
+
+    Layout is computed once for each (scroll offset, terminal width) and
+    shared by all rows in the table, so rows only format the cells in sight.
+    The first `pinned` columns are always shown; the rest could be scrolled
+    horizontally.
+    """
+
+    WEIGHT_MIN_WIDTH = 8
 
     display_attr: typing.Dict[str, hdtop.const._Attr]
 
-    def __init__(self, display_attr: dict) -> None:
-        super().__init__([])
+    def __init__(self, display_attr: dict, pinned: int = 0) -> None:
         self.display_attr = display_attr
+        self.columns = tuple(display_attr.items())
+        self.pinned = min(pinned, len(self.columns))
+        self.offset = 0
+        self._compiled = {}
+
+    def compact(self):
+        self._compiled.clear()
+
+    def scroll(self, step: int) -> bool:
+        """Scroll columns horizontally. Returns True if offset changed."""
+        last = max(len(self.columns) - self.pinned - 1, 0)
+        offset = max(0, min(self.offset + step, last))
+        if offset == self.offset:
+            return False
+        self.offset = offset
+        return True
+
+    def compile(self, maxcol: int) -> typing.Tuple[tuple, ...]:
+        """Get (column name, attr, width) of visible columns."""
+        key = (self.offset, maxcol)
+        layout = self._compiled.get(key)
+        if layout is None:
+            if len(self._compiled) > 32:
+                self._compiled.clear()
+            layout = self._compiled[key] = self._compile(maxcol)
+        return layout
+
+    def _compile(self, maxcol: int) -> typing.Tuple[tuple, ...]:
+        candidates = (
+            self.columns[: self.pinned] + self.columns[self.pinned + self.offset :]
+        )
+
+        # take columns until the line is full; 1 char separator between them
+        visible = []
+        used = -1
+        for name, attr in candidates:
+            width = attr.width if attr.width > 0 else self.WEIGHT_MIN_WIDTH
+            if used + 1 + width > maxcol:
+                if len(visible) <= self.pinned:
+                    visible.append([name, attr, max(maxcol - used - 1, 0)])
+                    used = maxcol
+                break
+            visible.append([name, attr, width])
+            used += 1 + width
+
+        # spread spare space to weighted columns
+        spare = max(maxcol - used, 0)
+        weighted = [column for column in visible if column[1].width <= 0]
+        total_weight = sum(-column[1].width for column in weighted)
+        for column in weighted:
+            extra = spare * -column[1].width // total_weight
+            column[2] += extra
+        if weighted:
+            weighted[-1][2] += spare - sum(
+                spare * -column[1].width // total_weight for column in weighted
+            )
+
+        return tuple(tuple(column) for column in visible)
+
+
+class Interpolator:
+    """Estimate time-derived columns between polls.
+
+    Elapsed time is advanced by local clock since the last poll; progress is
+    extrapolated by the rate between the last two polls, but not further than
+    one poll interval ahead.
+    """
 
-    def rows(self, size, focus):
+    COLUMNS = ("elapsedTime", "progress")
+
+    FINAL_STATES = ("FINISHED", "FAILED", "KILLED")
+
+    def __init__(self) -> None:
+        # app id -> (poll time, elapsed time, progress, progress rate)
+        self._samples: typing.Dict[str, tuple] = {}
+
+    def update(self, apps: typing.List[dict], now: float):
+        samples = {}
+        for app in apps:
+            if app.get("state") in self.FINAL_STATES:
+                continue
+
+            app_id = app.get("id")
+            progress = app.get("progress") or 0.0
+            rate = 0.0
+            if app.get("state") == "RUNNING":
+                last = self._samples.get(app_id)
+                if last and now > last[0]:
+                    rate = max((progress - last[2]) / (now - last[0]), 0.0)
+
+            samples[app_id] = (now, app.get("elapsedTime") or 0, progress, rate)
+
+        self._samples = samples
+
+    def estimate(self, app_id: str, now: float) -> typing.Dict[str, float]:
+        sample = self._samples.get(app_id)
+        if not sample:
+            return {}
+
+        polled, elapsed, progress, rate = sample
+        delta = now - polled
+        estimates = {"elapsedTime": elapsed + int(delta * 1000)}
+        if rate:
+            interval = hdtop.config.get_config("core", "queryInterval")
+            estimates["progress"] = min(progress + rate * min(delta, interval), 100.0)
+
+        return estimates
+
+
+class Row(urwid.Text):
+    """Single line of a table, rendered by the shared :py:class:`ColumnLayout`."""
+
+    column_layout: ColumnLayout
+
+    def __init__(self, column_layout: ColumnLayout) -> None:
+        super().__init__("", wrap=urwid.CLIP)
+        self.column_layout = column_layout
+        self.data = {}
+
+        # formatted (text, align) of cells
+        self._cells = {}
+        self._estimated = {}
+
+    def rows(self, size, focus=False):
         return 1
 
+    def selectable(self):
+        return True
+
+    def keypress(self, size, key):
+        return key
+
     def set_data(self, data: dict):
-        sep = (urwid.Text(" "), (urwid.GIVEN, 1, False))
+        self.data = data
+        self._cells = {}
+        self._estimated = {}
+        self._invalidate()
 
-        columns = []
-        for column, attr in self.display_attr.items():
-            widget = self.get_text(data.get(column, ""), attr.formatter, attr.align)
+    def set_estimate(self, name: str, value) -> bool:
+        """Show an estimated value, marked with `~`; or the real one if value
+        is None. Returns True if the displayed text changed."""
+        if value is None:
+            cell = None
+        else:
+            text, align = self.get_cell(value, self.column_layout.display_attr[name])
+            cell = ("~" + text, align)
 
-            if attr.width > 0:
-                option = (urwid.GIVEN, attr.width, False)
-            else:
-                option = (urwid.WEIGHT, -attr.width, False)
+        if self._estimated.get(name) == cell:
+            return False
+
+        if cell:
+            self._estimated[name] = cell
+        else:
+            del self._estimated[name]
+        self._invalidate()
+        return True
 
-            columns += [(widget, option), sep]
+    def get_cell(self, value, attr: hdtop.const._Attr) -> typing.Tuple[str, str]:
+        if value is None:
+            value = ""
+        elif value != "":
+            value = attr.formatter(value)
+        return value, attr.align
 
-        self.contents = columns
+    def get_line(self, maxcol: int) -> str:
+        cells = []
+        for name, attr, width in self.column_layout.compile(maxcol):
+            cell = self._estimated.get(name) or self._cells.get(name)
+            if cell is None:
+                cell = self._cells[name] = self.get_cell(self.data.get(name, ""), attr)
+            text, align = cell
+            cells.append(fit_text(text, width, align))
+        return " ".join(cells)
 
-    def get_text(self, text, formatter, align):
-        text = formatter(text)
-        return urwid.Text(text, align=align, wrap=urwid.CLIP)
+    def render(self, size, focus=False):
+        (maxcol,) = size
+        text = self.get_line(maxcol)
+        trans = urwid.text_layout.default_layout.layout(
+            text, maxcol, urwid.LEFT, urwid.CLIP
+        )
+        return urwid.canvas.apply_text_layout(text, [], trans, maxcol)
 
 
 class HeaderRow(Row):
-    def get_text(self, text, formatter, align):
-        return urwid.Text(text, align=urwid.LEFT, wrap=urwid.CLIP)
+    def get_cell(self, value, attr: hdtop.const._Attr) -> typing.Tuple[str, str]:
+        return value, urwid.LEFT
+
+
+def fit_text(text: str, width: int, align: str) -> str:
+    """Clip or pad the text to the given screen width."""
+    pos, text_width = urwid.util.calc_text_pos(text, 0, len(text), width)
+    text = text[:pos]
+    padding = " " * (width - text_width)
+    if align == urwid.RIGHT:
+        return padding + text
+    if align == urwid.CENTER:
+        half = len(padding) // 2
+        return padding[:half] + text + padding[half:]
+    return text + padding
@@ -0,0 +1,177 @@
+"""Authentication to secured ResourceManager, and the shared HTTP client
+"""
+import base64
+import getpass
+import logging
+import time
+import typing
+import urllib.parse
+
+import httpx
+
+import hdtop.config
+import hdtop.exception
+import hdtop.latency
+
+logger = logging.getLogger("hdtop.auth")
+
+AUTH_COOKIE = "hadoop.auth"
+
+_client = None
+
+
+def get_client() -> httpx.Client:
+    """Get the HTTP client shared by all panes. So connections and the auth
+    cookie are reused across them. Latency of each request is recorded."""
+    global _client
+    if _client is None:
+        _client = hdtop.latency.MeasuredClient(auth=create_auth())
+    return _client
+
+
+def set_client(client: httpx.Client):
+    """Replace the shared HTTP client; e.g. to replay a synthetic cluster."""
+    global _client
+    _client = client
+
+
+def create_auth() -> typing.Optional[httpx.Auth]:
+    """Create auth handler from `core.auth`."""
+    method = hdtop.config.get_config("core", "auth")
+    user = hdtop.config.get_config("core", "authUser")
+    if method == "simple":
+        return SimpleAuth(user or getpass.getuser())
+    if method == "kerberos":
+        return SpnegoAuth()
+    return None
+
+
+class SimpleAuth(httpx.Auth):
+    """Hadoop pseudo authentication; send `user.name` on each request."""
+
+    def __init__(self, user: str) -> None:
+        self.query = urllib.parse.urlencode({"user.name": user}).encode()
+
+    def auth_flow(self, request: httpx.Request):
+        query = request.url.query
+        query = query + b"&" + self.query if query else self.query
+        request.url = request.url.copy_with(query=query)
+        yield request
+
+
+class SpnegoAuth(httpx.Auth):
+    """Kerberos SPNEGO authentication, with `hadoop.auth` cookie reuse.
+
+    Negotiating costs a round trip to KDC and, if done on a 401 challenge, an
+    extra HTTP round trip. So once the RM issues the signed `hadoop.auth`
+    cookie, it is sent instead until it is about to expire; then the next
+    request negotiates proactively, without waiting for a 401.
+    """
+
+    # renegotiate when cookie expires in this many seconds
+    RENEW_MARGIN = 60
+
+    def __init__(self, token_provider: typing.Callable[[str], bytes] = None) -> None:
+        """
+        Parameters
+        ----------
+            token_provider : callable
+                Function to get initial GSS-API token for the given host.
+                Default uses `gssapi` package.
+        """
+        if not token_provider:
+            check_gssapi()
+        self.token_provider = token_provider or get_gssapi_token
+        self.cookie = None
+        self.expire = 0.0
+
+    def auth_flow(self, request: httpx.Request):
+        if self.cookie and time.time() < self.expire - self.RENEW_MARGIN:
+            set_auth_cookie(request, self.cookie)
+        elif self.cookie:
+            # about to expire; negotiate proactively
+            set_auth_cookie(request, None)
+            request.headers["Authorization"] = self.negotiate(request)
+
+        response = yield request
+
+        if response.status_code == 401 and is_negotiate(response):
+            self.cookie = None
+            set_auth_cookie(request, None)
+            request.headers["Authorization"] = self.negotiate(request)
+            response = yield request
+
+        self.update_cookie(response)
+
+    def negotiate(self, request: httpx.Request) -> str:
+        try:
+            token = self.token_provider(request.url.host)
+        except Exception as e:
+            raise hdtop.exception.AuthenticationError(
+                f"Failed to get Kerberos token for {request.url.host}: {e}",
+                request=request,
+            ) from e
+        return "Negotiate " + base64.b64encode(token).decode()
+
+    def update_cookie(self, response: httpx.Response):
+        value = response.cookies.get(AUTH_COOKIE)
+        if value is None:
+            return
+        if not value.strip('"'):  # cleared by server
+            self.cookie = None
+            return
+
+        self.cookie = value
+        self.expire = get_cookie_expire(value)
+
+
+def set_auth_cookie(request: httpx.Request, value: typing.Optional[str]):
+    """Replace `hadoop.auth` in the Cookie header, which may be added by the
+    client's cookie jar. Other cookies are kept."""
+    cookies = [
+        cookie
+        for cookie in request.headers.get("Cookie", "").split("; ")
+        if cookie and not cookie.startswith(AUTH_COOKIE + "=")
+    ]
+    if value:
+        cookies.append(f"{AUTH_COOKIE}={value}")
+
+    if cookies:
+        request.headers["Cookie"] = "; ".join(cookies)
+    else:
+        request.headers.pop("Cookie", None)
+
+
+def is_negotiate(response: httpx.Response) -> bool:
+    return any(
+        header.lower().startswith("negotiate")
+        for header in response.headers.get_list("www-authenticate")
+    )
+
+
+def get_cookie_expire(value: str) -> float:
+    """Get expire time (epoch seconds) from `hadoop.auth` cookie value; which
+    looks like `"u=user&p=user@REALM&t=kerberos&e=1609459200000&s=..."`."""
+    for field in value.strip('"').split("&"):
+        key, _, expire = field.partition("=")
+        if key == "e" and expire.isdigit():
+            return int(expire) / 1000
+    return 0.0
+
+
+def check_gssapi():
+    try:
+        import gssapi  # noqa: F401
+    except ImportError:
+        raise hdtop.exception.HdtopException(
+            "Package `gssapi` is required for kerberos auth. "
+            "Use `pip install gssapi` to install one."
+        )
+
+
+def get_gssapi_token(host: str) -> bytes:
+    import gssapi
+
+    name = gssapi.Name(f"HTTP@{host}", gssapi.NameType.hostbased_service)
+    context = gssapi.SecurityContext(name=name, usage="initiate")
+    return context.step()
@@ -7,9 +7,11 @@ import httpx
 import urwid
 import urwid.canvas
 
+import hdtop.auth
 import hdtop.config
 import hdtop.const
 import hdtop.exception
+import hdtop.latency
 
 logger = logging.getLogger("hdtop.cluster_metric")
 
@@ -17,9 +19,11 @@ logger = logging.getLogger("hdtop.cluster_metric")
 class ClusterMetricMonitor(urwid.BoxAdapter):
     """Upper pane that shows cluster metric."""
 
+    signals = ["update", "error"]
+
     uri: "str"
     client: "httpx.Client"
-    loop: "urwid.MainLoop"
+    loop: "hdtop.render.FrameLimitedLoop"
 
     def __init__(self) -> None:
         # left part
@@ -37,12 +41,16 @@ class ClusterMetricMonitor(urwid.BoxAdapter):
             ]
         )
 
+        # RM responsiveness
+        self.rm_health = RMHealth()
+
         # main
         main = urwid.Filler(
             urwid.Columns(
                 [
                     ("weight", 1, self.usage_bar),
                     ("weight", 1, self.numbers),
+                    (RMHealth.WIDTH, self.rm_health),
                 ]
             ),
             height=3,  # inner height
@@ -53,23 +61,37 @@ class ClusterMetricMonitor(urwid.BoxAdapter):
         # placeholder
         self.uri = None
         self.client = None
+        self.metrics = None
 
-    def set_event(self, loop: "urwid.MainLoop", api_uri: str):
+    def set_event(self, loop: "hdtop.render.FrameLimitedLoop", api_uri: str):
         self.uri = api_uri + "/ws/v1/cluster/metrics"
-        self.client = httpx.Client()
+        self.client = hdtop.auth.get_client()
 
         loop.set_alarm_in(0.6, self.event)
+        self.rm_health.set_event(loop, api_uri)
 
     def event(self, loop, user_data):
+        # schedule next query
+        loop.set_alarm_in(hdtop.config.get_config("core", "queryInterval"), self.event)
+
         # query
         try:
             resp = self.client.get(self.uri)
-        except httpx.HTTPError:
-            logger.exception("Failed to query cluster metric")
+        except httpx.HTTPError as e:
+            logger.warning("Failed to query cluster metric: %s", e)
+            urwid.emit_signal(self, "error", e)
             return
 
         # update
         metrics: dict = resp.json().get("clusterMetrics", {})
+        if metrics != self.metrics:
+            self.metrics = metrics
+            self.set_metrics(metrics)
+            loop.request_redraw()
+
+        urwid.emit_signal(self, "update", metrics)
+
+    def set_metrics(self, metrics: dict):
         self.app_count.set_counts(**metrics)
         self.node_count.set_counts(**metrics)
         self.container_count.set_counts(**metrics)
@@ -83,9 +105,118 @@ class ClusterMetricMonitor(urwid.BoxAdapter):
             metrics.get("totalMB", 0),
         )
 
+
+class RMHealth(urwid.ListBox):
+    """Responsiveness of RM as seen by hdtop: p50/p99 latency and median
+    payload size of each endpoint, and optionally RPC metrics from `/jmx`."""
+
+    WIDTH = 30
+
+    JMX_QUERY = "Hadoop:service=ResourceManager,name=RpcActivityForPort*"
+
+    def __init__(self) -> None:
+        self.lines = [urwid.Text("", wrap=urwid.CLIP) for _ in range(3)]
+        self.markups = [""] * len(self.lines)
+        super().__init__(self.lines)
+
+        # placeholder
+        self.uri = None
+        self.client = None
+        self.rpc = None
+
+    def set_event(self, loop: "hdtop.render.FrameLimitedLoop", api_uri: str):
+        self.uri = api_uri + "/jmx"
+        self.client = hdtop.auth.get_client()
+
+        loop.set_alarm_in(1.2, self.event)
+
+    def event(self, loop, user_data):
         # schedule next query
         loop.set_alarm_in(hdtop.config.get_config("core", "queryInterval"), self.event)
 
+        if hdtop.config.get_config("rm", "jmx"):
+            self.rpc = self.query_rpc()
+
+        if self.set_stats(hdtop.latency.get_recorder(), self.rpc):
+            loop.request_redraw()
+
+    def query_rpc(self) -> typing.Optional[typing.Tuple[float, int]]:
+        """Get max RPC queue time (ms) and total call queue length over all RPC
+        ports; None if not available."""
+        try:
+            resp = self.client.get(self.uri, params={"qry": self.JMX_QUERY})
+            resp.raise_for_status()
+            beans = resp.json().get("beans", [])
+        except (httpx.HTTPError, ValueError) as e:
+            logger.warning("Failed to query RM jmx: %s", e)
+            return None
+
+        if not beans:
+            return None
+
+        queue_time = max(bean.get("RpcQueueTimeAvgTime", 0) for bean in beans)
+        queue_length = sum(bean.get("CallQueueLength", 0) for bean in beans)
+        return queue_time, queue_length
+
+    def set_stats(
+        self,
+        recorder: "hdtop.latency.Recorder",
+        rpc: typing.Optional[typing.Tuple[float, int]],
+    ) -> bool:
+        """Update text. Returns True if anything changed."""
+        markups = []
+        for stats in recorder.get_stats():
+            if stats.endpoint == "jmx":
+                continue
+
+            markups.append(
+                [
+                    ("metric text", "%-8s" % stats.endpoint[:8]),
+                    self.latency_markup(stats.p50, 7),
+                    ("metric text", "/"),
+                    self.latency_markup(stats.p99, 6),
+                    ("metric text", "%7s" % hdtop.const.format_bytes(stats.size)),
+                ]
+            )
+
+        num_lines = len(self.lines)
+        if hdtop.config.get_config("rm", "jmx"):
+            num_lines -= 1
+            if rpc:
+                queue_time, queue_length = rpc
+                rpc_markup = [
+                    ("metric text", "RPC q "),
+                    self.latency_markup(int(queue_time * 1000), 6),
+                    ("metric text", " calls "),
+                    ("metric number", str(queue_length)),
+                ]
+            else:
+                rpc_markup = [("metric text", "RPC n/a")]
+
+        markups = markups[:num_lines]
+        markups += [""] * (num_lines - len(markups))
+        if num_lines < len(self.lines):
+            markups.append(rpc_markup)
+
+        if markups == self.markups:
+            return False
+
+        self.markups = markups
+        for line, markup in zip(self.lines, markups):
+            line.set_text(markup)
+        return True
+
+    @staticmethod
+    def latency_markup(us: typing.Optional[int], width: int) -> tuple:
+        if us is None:
+            return ("metric text", "-".rjust(width))
+        text = hdtop.const.format_latency(us).rjust(width)
+        if us >= 5000000:
+            return ("metric number fail", text)
+        if us >= 1000000:
+            return ("metric number warn", text)
+        return ("metric number", text)
+
 
 class ClusterResourceUsageBox(urwid.ListBox):
     TEXT_COLUMN_WIDTH = 7
@@ -63,7 +63,7 @@ def cli_handle_config(args: "argparse.Namespace"):
 
 
 def get_config_filename():
-    """Get config filename. Expected: $XDG_CACHE_HOME/hdtop/hdtop.conf"""
+    """Get config filename. Expected: $XDG_CONFIG_HOME/hdtop/hdtop.conf"""
     config_home = os.environ.get("XDG_CONFIG_HOME", "$HOME/.config")
     config_home = os.path.expandvars(config_home)
     config_home = os.path.expanduser(config_home)
@@ -77,6 +77,15 @@ def get_config_filename():
     return filename
 
 
+def get_cache_dirname():
+    """Get cache directory. Expected: $XDG_CACHE_HOME/hdtop"""
+    cache_home = os.environ.get("XDG_CACHE_HOME", "$HOME/.cache")
+    cache_home = os.path.expandvars(cache_home)
+    cache_home = os.path.expanduser(cache_home)
+
+    return pathlib.Path(cache_home).resolve() / hdtop.const.PROG_NAME
+
+
 def get_configs() -> dict:
     """Get complete configuration dict. Read config from XDG_CACHE_HOME if not
     loaded."""
@@ -136,16 +145,18 @@ def set_config(section, name, value) -> bool:
         )
         return False
 
-    # write config file
+    # write config file; keep sections that are not managed here (e.g. alerts)
+    filename = get_config_filename()
     writer = configparser.ConfigParser()
+    writer.read(filename)
     for section, values in _configs.items():
-        writer.add_section(section)
+        if not writer.has_section(section):
+            writer.add_section(section)
         for key, value in values.items():
             if value is None:
                 continue
             writer.set(section, key, str(value))
 
-    filename = get_config_filename()
     filename.parent.mkdir(exist_ok=True)
     with open(filename, "w") as fp:
         writer.write(fp)
@@ -24,6 +24,7 @@ PALETTE = [
     ("background", "default", "default"),
     ("footer", "black", "dark cyan"),
     ("footer key", "white", "default"),
+    ("footer stale", "white,bold", "dark cyan"),
     # cluster metric pane
     ("metric text", "dark cyan", "default"),
     ("metric number", "dark cyan,bold", "default"),
@@ -40,6 +41,19 @@ PALETTE = [
     # app info
     ("header", "black", "dark green"),
     ("app info", "white", "default"),
+    ("app info focus", "black", "light gray"),
+    ("app info new", "light green", "default"),
+    ("app info changed", "light cyan", "default"),
+    ("app info fail", "dark red,bold", "default"),
+    ("app info warn", "brown", "default"),
+    ("app info selected", "yellow,bold", "default"),
+    ("app info selected focus", "yellow,bold", "light gray"),
+    ("alert", "white,bold", "dark red"),
+    # app detail
+    ("detail title", "white,bold", "default"),
+    ("detail key", "dark cyan", "default"),
+    ("detail value", "white", "default"),
+    ("detail note", "dark gray,bold", "default"),
 ]
 
 
@@ -70,6 +84,28 @@ def format_memory(mb: int) -> str:
     return "%.2fM" % mb
 
 
+def format_latency(us: int) -> str:
+    if us >= 1000000:
+        return "%.1fs" % (us / 1000000)
+    if us >= 10000:
+        return "%dms" % (us // 1000)
+    return "%.1fms" % (us / 1000)
+
+
+def format_bytes(n: int) -> str:
+    UNITS = [
+        (1 << 30, "G"),
+        (1 << 20, "M"),
+        (1 << 10, "K"),
+    ]
+
+    for size, unit in UNITS:
+        if n >= size:
+            return "%.1f%s" % (n / size, unit)
+
+    return "%dB" % n
+
+
 def format_percent(f: float) -> str:
     return "{:.1f}".format(f)
 
@@ -89,10 +125,10 @@ def format_elapsed_time(t: int) -> str:
 
     output = []
     for size, unit in UNITS:
-        if t > size:
+        if t >= size:
             n = t // size
             output.append("%d%s" % (n, unit))
-            t -= size * t
+            t -= size * n
 
     if output:
         return " ".join(output)
@@ -131,16 +167,53 @@ HADOOP_APP_INFO = {
     "preemptedVcoreSeconds": _Attr("???", 5, str, urwid.RIGHT),
     "unmanagedApplication": _Attr("???", 5, str, urwid.LEFT),
     "amNodeLabelExpression": _Attr("???", 5, str, urwid.LEFT),
-    # HIDDEN items - this program does not read finished apps
-    # finalStatus
-    # trackingUI
-    # trackingUrl
-    # diagnostics
-    # finishedTime
-    # amContainerLogs
-    # amHostHttpAddress
 }
 
+HADOOP_APP_DETAIL = {
+    # name: (display text, formatter); shown in app detail pane only
+    "finalStatus": ("Final status", str),
+    "finishedTime": ("Finished", format_datetime),
+    "trackingUI": ("Tracking UI", str),
+    "trackingUrl": ("Tracking URL", str),
+    "amContainerLogs": ("AM logs", str),
+    "amHostHttpAddress": ("AM host", str),
+    "diagnostics": ("Diagnostics", str),
+}
+
+HADOOP_FINISHED_APP_INFO = {
+    # name: (header display, width, formatter, align)
+    "finishedTime": _Attr("Finish", 8, format_datetime, urwid.RIGHT),
+    "finalStatus": _Attr("Status", 9, str, urwid.LEFT),
+    "id": _Attr("AppID", 32, str, urwid.LEFT),
+    "user": _Attr("User", 8, str, urwid.LEFT),
+    "queue": _Attr("Queue", 8, str, urwid.LEFT),
+    "name": _Attr("Name", -1, str, urwid.LEFT),
+    "elapsedTime": _Attr("Time", 9, format_elapsed_time, urwid.RIGHT),
+}
+
+HADOOP_APP_ATTEMPT_INFO = {
+    # name: (header display, width, formatter, align)
+    "id": _Attr("#", 3, str, urwid.RIGHT),
+    "appAttemptState": _Attr("State", 9, str, urwid.LEFT),
+    "startTime": _Attr("Start", 8, format_datetime, urwid.RIGHT),
+    "nodeId": _Attr("Node", -1, str, urwid.LEFT),
+    "containerId": _Attr("AM container", -1, str, urwid.LEFT),
+}
+
+HADOOP_CONTAINER_INFO = {
+    # name: (header display, width, formatter, align)
+    "containerId": _Attr("ContainerID", -2, str, urwid.LEFT),
+    "containerState": _Attr("State", 9, str, urwid.LEFT),
+    "assignedNodeId": _Attr("Node", -1, str, urwid.LEFT),
+    "startedTime": _Attr("Start", 8, format_datetime, urwid.RIGHT),
+    "elapsedTime": _Attr("Time", 9, format_elapsed_time, urwid.RIGHT),
+    "allocatedMB": _Attr("Mem", 7, format_memory, urwid.RIGHT),
+    "allocatedVCores": _Attr("vCore", 5, str, urwid.RIGHT),
+}
+
+
+AUTH_METHODS = ("none", "simple", "kerberos")
+
 
 #
 # default values
@@ -156,6 +229,22 @@ def extract_api_base(string: str):
     return base
 
 
+def _boolean(string: str):
+    if isinstance(string, bool):
+        return string
+    if string.lower() in ("1", "yes", "true", "on"):
+        return True
+    if string.lower() in ("0", "no", "false", "off"):
+        return False
+    raise hdtop.exception.ConfigValueError(string, ("true", "false"))
+
+
+def _authMethod(string: str):
+    if string not in AUTH_METHODS:
+        raise hdtop.exception.ConfigValueError(string, AUTH_METHODS)
+    return string
+
+
 def _displayColumn(string: str):
     if string not in HADOOP_APP_INFO:
         raise hdtop.exception.ConfigValueError(string, HADOOP_APP_INFO)
@@ -166,6 +255,23 @@ DEFAULT_CONFIGS = [
     # section, key, type, value
     ("core", "hadoopAddress", extract_api_base, None),
     ("core", "queryInterval", float, 2.0),
+    ("core", "maxFps", float, 10.0),
+    ("core", "auth", _authMethod, "none"),
+    ("core", "authUser", str, None),
+    ("apps", "detailCacheTtl", float, 10.0),
+    ("apps", "flashDuration", float, 3.0),
+    ("apps", "interpolateInterval", float, 1.0),
+    ("apps", "finishedTail", _boolean, True),
+    ("apps", "finishedTailSize", int, 50),
+    ("apps", "finishedLookback", float, 600.0),
+    ("rm", "jmx", _boolean, False),
+    ("actions", "concurrency", int, 8),
+    ("alerts", "command", str, None),
+    ("cache", "warmStart", _boolean, True),
+    ("cache", "maxSize", int, 1 << 20),
+    ("wallboard", "maxRows", int, 200),
+    ("wallboard", "checkInterval", float, 300.0),
+    ("wallboard", "maxRss", float, 256.0),
     ("apps", "displayColumn.0", _displayColumn, "id"),
     ("apps", "displayColumn.1", _displayColumn, "state"),
     ("apps", "displayColumn.2", _displayColumn, "startedTime"),
@@ -1,5 +1,6 @@
 """Collection of all exception classes
 """
+import httpx
 
 
 class HdtopException(Exception):
@@ -25,3 +26,8 @@ class MissingConfigurationError(ConfigValueError):
     def __str__(self) -> str:
         wanted_key = self.args[0]
         return f"Config `{wanted_key}` is required. Use `hdtop config {wanted_key} <value>` to set one."
+
+
+class AuthenticationError(HdtopException, httpx.RequestError):
+    """Failed to get credentials for a request; e.g. no Kerberos ticket. It is
+    a :py:class:`httpx.HTTPError`, so pollers handle it as a failed query."""
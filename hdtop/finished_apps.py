@@ -0,0 +1,158 @@
+"""Widgets for recently finished apps (bottom pane)
+"""
+import collections
+import logging
+import time
+import typing
+
+import httpx
+import urwid
+
+import hdtop.apps_status
+import hdtop.auth
+import hdtop.config
+import hdtop.const
+
+logger = logging.getLogger("hdtop.finished_apps")
+
+
+class FinishedApps(urwid.Frame):
+    """Tail of recently finished apps.
+
+    Only apps finished after the last seen `finishedTime` (the watermark) are
+    queried on each poll, so the RM does not send its whole retention history
+    every time. Results are kept in a bounded ring, newest first.
+    """
+
+    HEIGHT = 8
+
+    FAILED_STATUS = ("FAILED", "KILLED")
+
+    text_attr: typing.Dict[str, hdtop.const._Attr]
+    recent: typing.Deque[dict]
+
+    def __init__(self, wallboard: bool = False) -> None:
+        """
+        Parameters
+        ----------
+            wallboard : bool
+                Read-only display; rows are not highlighted on focus
+        """
+        self.focus_attr = None if wallboard else "app info focus"
+        self.text_attr = hdtop.const.HADOOP_FINISHED_APP_INFO
+        self.recent = collections.deque(
+            maxlen=hdtop.config.get_config("apps", "finishedTailSize")
+        )
+
+        # view
+        self.title = urwid.Text("")
+        self.layout = hdtop.apps_status.ColumnLayout(self.text_attr)
+        self.header_row = hdtop.apps_status.HeaderRow(self.layout)
+        self.header_row.set_data(
+            {column: attr.display_text for column, attr in self.text_attr.items()}
+        )
+
+        self.listbox = urwid.ListBox([])
+        super().__init__(
+            header=urwid.Pile([self.title, urwid.AttrWrap(self.header_row, "header")]),
+            body=self.listbox,
+        )
+        self.set_title()
+
+        # placeholder
+        self.uri = None
+        self.client = None
+        self.watermark = None
+        self.row_widgets: typing.Dict[str, urwid.AttrMap] = {}
+
+    def set_event(self, loop: "hdtop.render.FrameLimitedLoop", api_uri: str):
+        self.uri = api_uri + "/ws/v1/cluster/apps"
+        self.client = hdtop.auth.get_client()
+
+        lookback = hdtop.config.get_config("apps", "finishedLookback")
+        self.watermark = int((time.time() - lookback) * 1000)
+
+        loop.set_alarm_in(1.8, self.event)
+
+    def event(self, loop, user_data):
+        # schedule next query
+        loop.set_alarm_in(hdtop.config.get_config("core", "queryInterval"), self.event)
+
+        # query
+        try:
+            resp = self.client.get(
+                self.uri,
+                params={
+                    "states": "FINISHED,FAILED,KILLED",
+                    "finishedTimeBegin": self.watermark,
+                },
+            )
+        except httpx.HTTPError as e:
+            logger.warning("Failed to query finished apps: %s", e)
+            return
+
+        # update
+        apps = (resp.json().get("apps") or {}).get("app", [])
+        if self.add_apps(apps):
+            loop.request_redraw()
+
+    def add_apps(self, apps: typing.List[dict]) -> bool:
+        """Push newly finished apps into the ring. Returns True if any added."""
+        # the watermark is inclusive; apps finished at that exact moment would
+        # be returned again
+        seen = {app.get("id") for app in self.recent}
+        apps = [app for app in apps if app.get("id") not in seen]
+        if not apps:
+            return False
+
+        apps.sort(key=lambda app: app.get("finishedTime", 0))
+        for app in apps:
+            self.recent.appendleft(app)
+
+        self.watermark = max(self.watermark, apps[-1].get("finishedTime", 0))
+
+        self.set_apps()
+        return True
+
+    def set_apps(self):
+        # finished apps never change; only create rows for new ones
+        row_widgets = {}
+        for app in self.recent:
+            row = self.row_widgets.get(app.get("id"))
+            if not row:
+                if app.get("finalStatus") in self.FAILED_STATUS:
+                    attr = "app info fail"
+                else:
+                    attr = "app info"
+
+                row = urwid.AttrMap(
+                    hdtop.apps_status.Row(self.layout), attr, self.focus_attr
+                )
+                row.original_widget.set_data(app)
+            row_widgets[app.get("id")] = row
+
+        self.row_widgets = row_widgets
+        self.listbox.body = list(row_widgets.values())
+        self.set_title()
+
+    def compact(self, aggressive: bool = False):
+        """Drop cached data that could be rebuilt."""
+        self.layout.compact()
+
+    def set_title(self):
+        counts = collections.Counter(app.get("finalStatus") for app in self.recent)
+
+        markup = [
+            ("metric text", "Recently finished: "),
+            ("metric number", str(len(self.recent))),
+        ]
+        for status in self.FAILED_STATUS:
+            if not counts[status]:
+                continue
+            markup += [
+                ("metric text", ", "),
+                ("metric number fail", str(counts[status])),
+                ("metric text fail", " " + status.lower()),
+            ]
+
+        self.title.set_text(markup)
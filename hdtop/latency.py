@@ -0,0 +1,165 @@
+"""Latency and payload size of requests to RM
+"""
+import re
+import threading
+import time
+import typing
+import urllib.parse
+
+import httpx
+
+_recorder = None
+
+
+class Histogram:
+    """HDR-style histogram in fixed memory.
+
+    Values below `2 ** precision` are counted exactly; larger ones go to
+    log-linear buckets, each power of two split into `2 ** (precision - 1)`
+    buckets. Relative error is about `1 / 2 ** (precision - 1)`.
+    Counts are halved every `half_life` seconds, on both record and read, so
+    percentiles follow recent values and fade out once an endpoint is idle.
+    """
+
+    def __init__(
+        self, precision: int = 4, max_bits: int = 32, half_life: float = 60.0
+    ) -> None:
+        self.precision = precision
+        self.max_value = (1 << max_bits) - 1
+        self._exact = 1 << precision
+        self._half = 1 << (precision - 1)
+        self.counts = [0] * (self._exact + (max_bits - precision) * self._half)
+        self.total = 0
+        self.half_life = half_life
+        self._last_decay = time.monotonic()
+
+    def index(self, value: int) -> int:
+        value = min(max(int(value), 0), self.max_value)
+        if value < self._exact:
+            return value
+        shift = value.bit_length() - self.precision
+        return self._exact + (shift - 1) * self._half + (value >> shift) - self._half
+
+    def value_at(self, index: int) -> int:
+        """Middle value of the bucket."""
+        if index < self._exact:
+            return index
+        shift, offset = divmod(index - self._exact, self._half)
+        shift += 1
+        low = (offset + self._half) << shift
+        return low + (1 << shift) // 2
+
+    def record(self, value: int):
+        self.decay()
+        self.counts[self.index(value)] += 1
+        self.total += 1
+
+    def decay(self):
+        halvings = int((time.monotonic() - self._last_decay) // self.half_life)
+        if halvings <= 0:
+            return
+        self._last_decay += halvings * self.half_life
+        self.counts = [count >> halvings for count in self.counts]
+        self.total = sum(self.counts)
+
+    def percentile(self, q: float) -> typing.Optional[int]:
+        self.decay()
+        if not self.total:
+            return None
+        threshold = self.total * q / 100
+        cumulative = 0
+        for index, count in enumerate(self.counts):
+            cumulative += count
+            if count and cumulative >= threshold:
+                return self.value_at(index)
+        return None
+
+
+class EndpointStats(typing.NamedTuple):
+    endpoint: str
+    p50: typing.Optional[int]
+    p99: typing.Optional[int]
+    size: typing.Optional[int]
+
+
+class Recorder:
+    """Latency (µs) and payload size (bytes) histograms for each endpoint.
+
+    Requests are also sent from worker threads (bulk actions); so all access
+    to histograms is serialized by a lock, and readers get a snapshot from
+    :py:meth:`get_stats`.
+    """
+
+    def __init__(self) -> None:
+        self.latency: typing.Dict[str, Histogram] = {}
+        self.size: typing.Dict[str, Histogram] = {}
+        self._lock = threading.Lock()
+
+    def record(self, endpoint: str, latency: float, size: int):
+        with self._lock:
+            if endpoint not in self.latency:
+                self.latency[endpoint] = Histogram()
+                self.size[endpoint] = Histogram()
+            self.latency[endpoint].record(latency * 1e6)
+            self.size[endpoint].record(size)
+
+    def get_stats(self) -> typing.List[EndpointStats]:
+        """Get p50/p99 latency and median payload size of endpoints that have
+        recent samples."""
+        stats = []
+        with self._lock:
+            for endpoint, histogram in self.latency.items():
+                p50 = histogram.percentile(50)
+                if p50 is None:
+                    continue
+                stats.append(
+                    EndpointStats(
+                        endpoint,
+                        p50,
+                        histogram.percentile(99),
+                        self.size[endpoint].percentile(50),
+                    )
+                )
+        return stats
+
+
+def get_recorder() -> Recorder:
+    global _recorder
+    if _recorder is None:
+        _recorder = Recorder()
+    return _recorder
+
+
+def get_endpoint(url: httpx.URL) -> str:
+    """Get short endpoint name from URL; e.g. `apps/*/appattempts`. Query for
+    finished apps is tagged as `apps?finished`, as its latency and payload
+    differ from the active apps query."""
+    path = url.path
+    if path.startswith("/ws/v1/cluster/"):
+        path = path[15:]
+    path = re.sub(r"(application|appattempt|container)_[\w]+", "*", path)
+    path = path.strip("/") or "/"
+
+    query = urllib.parse.parse_qs(url.query.decode())
+    if "finishedTimeBegin" in query:
+        path += "?finished"
+    return path
+
+
+class MeasuredClient(httpx.Client):
+    """HTTP client that records latency and payload size of each request.
+
+    Latency covers the whole exchange, including auth retries and reading
+    the body.
+    """
+
+    def send(self, request: httpx.Request, **kwargs) -> httpx.Response:
+        start = time.perf_counter()
+        response = super().send(request, **kwargs)
+        if not kwargs.get("stream"):
+            get_recorder().record(
+                get_endpoint(request.url),
+                time.perf_counter() - start,
+                len(response.content),
+            )
+        return response
@@ -1,15 +1,27 @@
 """Main loop / UI handler for hdtop. Not the main loop.
 """
 import argparse
+import logging
+import logging.handlers
 import sys
+import time
+import typing
 
 import urwid
 import urwid.raw_display
 
+import hdtop.actions
+import hdtop.alert
 import hdtop.apps_status
+import hdtop.auth
 import hdtop.cluster_metric
 import hdtop.config
 import hdtop.const
+import hdtop.exception
+import hdtop.finished_apps
+import hdtop.memory
+import hdtop.render
+import hdtop.snapshot
 
 
 def setup_argparse():
@@ -23,6 +35,21 @@ def setup_argparse():
         default=hdtop.config.get_config("core", "hadoopAddress"),
         help="URI to hadoop cluster",
     )
+    parser.add_argument(
+        "--batch",
+        action="store_true",
+        help="Run without UI. Alerts are printed to stdout.",
+    )
+    parser.add_argument(
+        "--events",
+        action="store_true",
+        help="Also print added / changed / removed apps on batch mode.",
+    )
+    parser.add_argument(
+        "--wallboard",
+        action="store_true",
+        help="Read-only display with bounded memory, for long running sessions.",
+    )
     return parser
 
 
@@ -34,32 +61,129 @@ def start_ui(args):
         print("Use `hdtop config {wanted_key} <value>` to set one.", file=sys.stderr)
         return 1
 
+    # logs would be written over the screen
+    if not args.batch:
+        setup_file_logging()
+
     # start main loop
-    MainDisplay().main(args.uri)
+    try:
+        hdtop.auth.get_client()
+        display = MainDisplay(wallboard=args.wallboard)
+    except hdtop.exception.HdtopException as e:
+        print(e, file=sys.stderr)
+        return 1
+
+    display.main(args.uri, batch=args.batch, events=args.events)
+
+
+LOG_MAX_SIZE = 1 << 20
+
+
+def setup_file_logging():
+    """Send logs to `hdtop.log` under the cache directory, rotated at
+    LOG_MAX_SIZE. Logs are dropped if the file could not be opened."""
+    filename = hdtop.config.get_cache_dirname() / "hdtop.log"
+    try:
+        filename.parent.mkdir(parents=True, exist_ok=True)
+        handler = logging.handlers.RotatingFileHandler(
+            filename, maxBytes=LOG_MAX_SIZE, backupCount=1
+        )
+    except OSError:
+        handler = logging.NullHandler()
+
+    handler.setFormatter(
+        logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s")
+    )
+    logging.basicConfig(level=logging.WARNING, handlers=[handler])
 
 
 class MainDisplay:
     """Main display controller."""
 
-    def __init__(self) -> None:
+    def __init__(self, wallboard: bool = False) -> None:
+        self.wallboard = wallboard
+
         # panels
         self.upper_pane = hdtop.cluster_metric.ClusterMetricMonitor()
-        self.body = hdtop.apps_status.AppStatus()
+        self.body = hdtop.apps_status.AppStatus(wallboard=wallboard)
+        self.finished = None
+        if hdtop.config.get_config("apps", "finishedTail"):
+            self.finished = hdtop.finished_apps.FinishedApps(wallboard=wallboard)
 
         # footer
         footer_text = [
             # platte, text
+            ("footer key", "Enter"),
+            ("footer", "Detail "),
+            ("footer key", "\u2190\u2192"),
+            ("footer", "Columns "),
+            ("footer key", "Space"),
+            ("footer", "Select "),
+            ("footer key", "F6"),
+            ("footer", "Queue "),
+            ("footer key", "F7"),
+            ("footer", "Priority "),
+            ("footer key", "F9"),
+            ("footer", "Kill "),
             ("footer key", "F10"),
             ("footer", "Quit"),
         ]
-        self.footer = urwid.AttrWrap(urwid.Text(footer_text), "footer")
+        if wallboard:
+            footer_text = footer_text[-2:]
+        self.message = urwid.Text("", align=urwid.RIGHT)
+        self.status = urwid.Text("", align=urwid.RIGHT)
+        self.connection = urwid.Text("", align=urwid.RIGHT)
+        self.footer = urwid.AttrWrap(
+            urwid.Columns(
+                [
+                    urwid.Text(footer_text),
+                    ("pack", self.message),
+                    ("pack", self.status),
+                    ("pack", self.connection),
+                ]
+            ),
+            "footer",
+        )
+
+        # connection state; cluster metrics query is taken as the heartbeat
+        self.unreachable_since = None
+        urwid.connect_signal(self.upper_pane, "error", self.on_poll_error)
+        urwid.connect_signal(self.upper_pane, "update", self.on_poll_success)
+
+        # prompt for bulk actions and selection filter
+        self.prompt = None
+        self.prompt_callback = None
+        urwid.connect_signal(self.body, "select", self.on_select)
+
+        # memory self-check
+        self.watchdog = None
+        if wallboard:
+            self.watchdog = hdtop.memory.MemoryWatchdog(
+                self.compact, self.on_memory_check
+            )
+
+        # alerts
+        self.alerts = hdtop.alert.AlertEngine(hdtop.alert.load_rules())
+        self.alert_bar = urwid.Text("", wrap=urwid.CLIP)
+        if self.alerts:
+            urwid.connect_signal(self.upper_pane, "update", self.on_cluster_update)
+            urwid.connect_signal(self.body, "update", self.on_apps_update)
 
         # main view
+        body = self.body
+        if self.finished:
+            body = urwid.Pile(
+                [
+                    ("weight", 1, self.body),
+                    (self.finished.HEIGHT, self.finished),
+                ]
+            )
+
         self.view = urwid.Frame(
             header=self.upper_pane,
-            body=self.body,
+            body=body,
             footer=self.footer,
-            focus_part="header",
+            focus_part="body",
         )
 
         # screen
@@ -68,20 +192,273 @@ class MainDisplay:
 
         # placeholder
         self.loop = None
+        self.batch = False
+        self.api_uri = None
+        self.stale_panes = set()
 
-    def main(self, api_uri):
-        self.loop = urwid.MainLoop(
-            widget=self.view,
-            palette=hdtop.const.PALETTE,
-            screen=self.screen,
-            unhandled_input=self.unhandled_input,
-        )
+    SNAPSHOT_SAVE_INTERVAL = 60
+
+    def main(self, api_uri, batch=False, events=False):
+        self.batch = batch
+        if batch:
+            self.loop = hdtop.render.BatchLoop()
+            if events:
+                urwid.connect_signal(self.body, "delta", self.print_delta)
+        else:
+            self.loop = hdtop.render.FrameLimitedLoop(
+                widget=self.view,
+                palette=hdtop.const.PALETTE,
+                screen=self.screen,
+                unhandled_input=self.unhandled_input,
+                input_filter=self.wallboard_filter if self.wallboard else None,
+                max_fps=hdtop.config.get_config("core", "maxFps"),
+            )
 
-        self.upper_pane.set_event(self.loop, api_uri)
-        self.body.set_event(self.loop, api_uri)
+        self.set_event(self.loop, api_uri)
+
+        warm_start = not batch and hdtop.config.get_config("cache", "warmStart")
+        if warm_start:
+            self.load_snapshot()
+            self.loop.set_alarm_in(self.SNAPSHOT_SAVE_INTERVAL, self.save_snapshot)
 
         self.loop.run()
 
+        if warm_start:
+            self.save_snapshot()
+
+    def set_event(self, loop, api_uri):
+        """Start polling of all panes on the loop."""
+        self.loop = loop
+        self.api_uri = api_uri
+
+        self.upper_pane.set_event(loop, api_uri)
+        self.body.set_event(loop, api_uri)
+        if self.finished:
+            self.finished.set_event(loop, api_uri)
+        if self.watchdog:
+            self.watchdog.set_event(loop)
+
+    def compact(self, aggressive: bool = False):
+        """Drop cached data that could be rebuilt."""
+        self.body.compact(aggressive)
+        if self.finished:
+            self.finished.compact(aggressive)
+        if aggressive:
+            urwid.CanvasCache.clear()
+
+    def on_memory_check(self, rss: "typing.Optional[int]"):
+        if rss is None:
+            return
+        self.set_footer_text(
+            self.status, ("footer", f" RSS {hdtop.const.format_bytes(rss)} ")
+        )
+        self.loop.request_redraw()
+
+    def on_poll_error(self, error: Exception):
+        if self.unreachable_since is not None:
+            return
+        self.unreachable_since = time.time()
+        timestamp = time.strftime("%H:%M:%S", time.localtime(self.unreachable_since))
+        self.set_footer_text(
+            self.connection, ("alert", f" RM unreachable since {timestamp} ")
+        )
+        self.loop.request_redraw()
+
+    def on_poll_success(self, metrics: dict):
+        if self.unreachable_since is None:
+            return
+        self.unreachable_since = None
+        self.set_footer_text(self.connection, "")
+        self.loop.request_redraw()
+
+    def load_snapshot(self):
+        """Show cached data marked as stale, until live data arrived."""
+        snapshot = hdtop.snapshot.load_snapshot(self.api_uri)
+        if not snapshot:
+            return
+
+        if snapshot.metrics:
+            self.upper_pane.metrics = snapshot.metrics
+            self.upper_pane.set_metrics(snapshot.metrics)
+        if snapshot.apps:
+            self.body.set_apps(snapshot.apps, self.body.diff.update(snapshot.apps))
+
+        timestamp = time.strftime("%m-%d %H:%M:%S", time.localtime(snapshot.timestamp))
+        self.set_footer_text(
+            self.status, ("footer stale", f" STALE: cached at {timestamp} ")
+        )
+
+        self.stale_panes = {self.upper_pane, self.body}
+        for pane in self.stale_panes:
+            urwid.connect_signal(pane, "update", self.on_live_update, user_args=[pane])
+
+    def on_live_update(self, pane, data):
+        if pane not in self.stale_panes:
+            return
+        self.stale_panes.discard(pane)
+        if not self.stale_panes:
+            self.set_footer_text(self.status, "")
+            self.loop.request_redraw()
+
+    def save_snapshot(self, loop=None, user_data=None):
+        if loop:
+            loop.set_alarm_in(self.SNAPSHOT_SAVE_INTERVAL, self.save_snapshot)
+
+        # only save live data
+        if self.stale_panes or self.body.apps is None:
+            return
+
+        columns = ["id"] + [column for column in self.body.text_attr if column != "id"]
+        hdtop.snapshot.save_snapshot(
+            self.api_uri, self.upper_pane.metrics, self.body.apps, columns
+        )
+
+    WALLBOARD_KEYS = ("q", "Q", "f10", "window resize")
+
+    def wallboard_filter(self, keys: list, raw: list) -> list:
+        """Drop all input but quit and resize before it reaches any widget;
+        so focus never moves on wallboard mode."""
+        return [key for key in keys if key in self.WALLBOARD_KEYS]
+
     def unhandled_input(self, key):
+        if self.prompt:
+            if key in ("enter", "esc"):
+                self.close_prompt(key == "enter")
+            return
+
         if key in ("q", "Q", "f10"):
             raise urwid.ExitMainLoop()
+        elif self.wallboard:
+            return
+        elif key == "/":
+            self.ask("Select where: ", self.select_where)
+        elif key == "f6":
+            self.prompt_action("queue")
+        elif key == "f7":
+            self.prompt_action("priority")
+        elif key == "f9":
+            self.prompt_action("kill")
+
+    def print_delta(self, delta: hdtop.snapshot.Delta):
+        for line in hdtop.snapshot.format_delta(delta):
+            print(line, flush=True)
+
+    def on_cluster_update(self, metrics: dict):
+        self.handle_alerts(self.alerts.evaluate_cluster(metrics))
+
+    def on_apps_update(self, apps: list):
+        transitions = self.alerts.evaluate_apps(apps)
+        if self.body.set_highlight(self.alerts.firing_keys("app")):
+            self.loop.request_redraw()
+        self.handle_alerts(transitions)
+
+    def handle_alerts(self, transitions: "typing.List[hdtop.alert.Transition]"):
+        if not transitions:
+            return
+
+        if self.batch:
+            for transition in transitions:
+                hdtop.alert.emit(transition)
+            return
+
+        # update alert bar
+        markup = [("alert", " ALERT ")]
+        for alert in sorted(self.alerts.firing.values()):
+            text = alert.rule
+            if alert.target != "cluster":
+                text += f"({alert.key})"
+            markup += [("metric text fail", " " + text)]
+        self.alert_bar.set_text(markup)
+
+        self.update_footer()
+        self.loop.request_redraw()
+
+    def set_footer_text(self, widget: urwid.Text, markup):
+        widget.set_text(markup)
+        # packed columns cache their widths
+        self.footer.original_widget._invalidate()
+
+    def update_footer(self):
+        footer = self.footer
+        if self.prompt:
+            footer = urwid.AttrWrap(self.prompt, "footer")
+        if self.alerts.firing:
+            footer = urwid.Pile([self.alert_bar, footer])
+
+        self.view.footer = footer
+        self.view.focus_position = "footer" if self.prompt else "body"
+
+    def ask(self, caption: str, callback: "typing.Callable[[str], None]"):
+        """Prompt for a line of text in footer. Callback is not called if the
+        user cancelled."""
+        self.prompt = urwid.Edit(("footer key", caption))
+        self.prompt_callback = callback
+        self.update_footer()
+
+    def close_prompt(self, accepted: bool):
+        text = self.prompt.edit_text
+        callback = self.prompt_callback
+        self.prompt = self.prompt_callback = None
+        self.update_footer()
+        if accepted:
+            callback(text)
+
+    def on_select(self, selected: set):
+        self.set_footer_text(
+            self.message,
+            (
+                [("footer key", f" {len(selected)} "), ("footer", "selected ")]
+                if selected
+                else ""
+            ),
+        )
+        self.loop.request_redraw()
+
+    def select_where(self, expression: str):
+        rule = hdtop.alert.Rule("select", "app", expression, 0.0, 0.0)
+        try:
+            predicate = hdtop.alert.compile_rules([rule])
+            self.body.select_where(lambda app: predicate(app)[0])
+        except (hdtop.exception.ConfigValueError, TypeError, ValueError):
+            # parse error, or values that could not be compared
+            self.set_footer_text(
+                self.message, ("alert", f" Invalid filter: {expression} ")
+            )
+
+    def prompt_action(self, action: str):
+        app_ids = self.body.get_targets()
+        if not app_ids:
+            return
+
+        count = f"{len(app_ids)} app" + ("s" if len(app_ids) > 1 else "")
+        if action == "kill":
+            caption = f"Kill {count}? [y/N] "
+        elif action == "queue":
+            caption = f"Move {count} to queue: "
+        else:
+            caption = f"Set priority of {count} to: "
+
+        def callback(text: str):
+            text = text.strip()
+            if action == "kill":
+                if text.lower() in ("y", "yes"):
+                    self.run_action(action, app_ids)
+            elif text:
+                self.run_action(action, app_ids, text)
+
+        self.ask(caption, callback)
+
+    def run_action(self, action: str, app_ids: "typing.List[str]", value: str = None):
+        try:
+            bulk = hdtop.actions.BulkAction(action, app_ids, value)
+        except ValueError:
+            self.set_footer_text(self.message, ("alert", f" Invalid value: {value} "))
+            return
+
+        self.body.set_selected(set())
+        bulk.start(self.loop, self.api_uri, self.on_action_progress)
+        self.on_action_progress(bulk)
+
+    def on_action_progress(self, bulk: hdtop.actions.BulkAction):
+        self.set_footer_text(self.message, bulk.get_summary())
+        self.loop.request_redraw()
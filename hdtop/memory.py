@@ -0,0 +1,75 @@
+"""Memory self-check for long running sessions
+"""
+import gc
+import logging
+import os
+import typing
+
+import hdtop.config
+
+logger = logging.getLogger("hdtop.memory")
+
+
+def get_rss() -> typing.Optional[int]:
+    """Get resident set size (bytes) of this process. Returns None if not
+    available on the platform."""
+    try:
+        with open("/proc/self/statm") as fp:
+            pages = int(fp.read().split()[1])
+    except (OSError, ValueError, IndexError):
+        return None
+    return pages * os.sysconf("SC_PAGE_SIZE")
+
+
+class MemoryWatchdog:
+    """Compact caches and check RSS periodically.
+
+    Caches are compacted on every check. If RSS exceeds `wallboard.maxRss`,
+    they are compacted aggressively; i.e. also drop entries that are not
+    expired yet.
+    """
+
+    def __init__(
+        self,
+        compact: typing.Callable[[bool], None],
+        on_check: typing.Callable[[typing.Optional[int]], None] = None,
+    ) -> None:
+        """
+        Parameters
+        ----------
+            compact : callable
+                Function to compact caches; takes `aggressive` flag
+            on_check : callable
+                Called with RSS (bytes) after each check
+        """
+        self.compact = compact
+        self.on_check = on_check
+        self.rss = None
+
+    def set_event(self, loop: "hdtop.render.FrameLimitedLoop"):
+        loop.set_alarm_in(
+            hdtop.config.get_config("wallboard", "checkInterval"), self.event
+        )
+
+    def event(self, loop, user_data):
+        # schedule next check
+        loop.set_alarm_in(
+            hdtop.config.get_config("wallboard", "checkInterval"), self.event
+        )
+
+        self.check()
+        if self.on_check:
+            self.on_check(self.rss)
+
+    def check(self):
+        limit = hdtop.config.get_config("wallboard", "maxRss") * (1 << 20)
+
+        self.compact(False)
+        gc.collect()
+        self.rss = get_rss()
+
+        if self.rss is not None and self.rss > limit:
+            logger.warning("RSS %d bytes exceeds limit; compact aggressively", self.rss)
+            self.compact(True)
+            gc.collect()
+            self.rss = get_rss()
@@ -0,0 +1,81 @@
+"""Frame scheduling for the main loop
+"""
+import logging
+import time
+
+import urwid
+
+logger = logging.getLogger("hdtop.render")
+
+
+class FrameLimitedLoop(urwid.MainLoop):
+    """MainLoop that coalesces redraw requests into frames.
+
+    The stock :py:class:`urwid.MainLoop` repaints the screen every time it
+    enters idle state, i.e. after every alarm callback. With several panes
+    polling at a short interval, that is one repaint per response. This loop
+    only repaints when something asked for it via :py:meth:`request_redraw`
+    (or on user input), merges all requests made within one frame into a
+    single repaint, and never repaints more than `max_fps` times per second.
+    """
+
+    def __init__(self, *args, max_fps: float = 10.0, **kwargs) -> None:
+        """
+        Parameters
+        ----------
+            max_fps : float
+                Upper bound of screen repaints per second
+        """
+        super().__init__(*args, **kwargs)
+        self._frame_interval = 1.0 / max(max_fps, 0.1)
+        self._last_frame = 0.0
+        self._frame_handle = None
+        self._dirty = True
+
+    def request_redraw(self):
+        """Mark the screen as outdated. It would be repainted in next frame."""
+        self._dirty = True
+
+    def process_input(self, keys):
+        self._dirty = True
+        return super().process_input(keys)
+
+    def entering_idle(self):
+        if self._dirty and not self._frame_handle:
+            delay = self._last_frame + self._frame_interval - time.monotonic()
+            self._frame_handle = self.set_alarm_in(max(delay, 0.0), self._draw_frame)
+
+    def _draw_frame(self, loop, user_data):
+        self._frame_handle = None
+        if not self._dirty or not self.screen.started:
+            return
+
+        self._dirty = False
+        self._last_frame = time.monotonic()
+        self.draw_screen()
+
+
+class BatchLoop:
+    """Headless stand-in of :py:class:`FrameLimitedLoop` for batch mode. Panes
+    keep polling on it but nothing is rendered."""
+
+    def __init__(self) -> None:
+        self.event_loop = urwid.SelectEventLoop()
+
+    def set_alarm_in(self, sec, callback, user_data=None):
+        def cb():
+            callback(self, user_data)
+
+        return self.event_loop.alarm(sec, cb)
+
+    def remove_alarm(self, handle):
+        return self.event_loop.remove_alarm(handle)
+
+    def request_redraw(self):
+        pass
+
+    def run(self):
+        try:
+            self.event_loop.run()
+        except (KeyboardInterrupt, urwid.ExitMainLoop):
+            pass
@@ -0,0 +1,185 @@
+"""Diff between consecutive snapshots, and on-disk snapshot cache
+"""
+import logging
+import marshal
+import os
+import re
+import tempfile
+import time
+import typing
+import zlib
+
+import hdtop.config
+
+logger = logging.getLogger("hdtop.snapshot")
+
+# magic bytes and format version of cache file
+CACHE_MAGIC = b"HDTS\x01"
+
+# max number of clusters to keep cache for
+CACHE_MAX_FILES = 16
+
+
+class Delta(typing.NamedTuple):
+    """Changes between two snapshots."""
+
+    added: typing.List[dict]
+    removed: typing.List[dict]
+    changed: typing.List[typing.Tuple[dict, typing.Tuple[str, ...]]]
+
+    def __bool__(self) -> bool:
+        return bool(self.added or self.removed or self.changed)
+
+
+class SnapshotDiff:
+    """Compare items with the previous snapshot by their key.
+
+    Only the projected columns are compared. Each item keeps its projection
+    as a tuple, so an unchanged item costs a single tuple comparison.
+    """
+
+    def __init__(self, columns: typing.Iterable[str], key: str = "id") -> None:
+        self.columns = tuple(columns)
+        self.key = key
+
+        # key -> (projection, item)
+        self._snapshot: typing.Dict[typing.Any, tuple] = {}
+
+    def __len__(self) -> int:
+        return len(self._snapshot)
+
+    def update(self, items: typing.Iterable[dict]) -> Delta:
+        columns = self.columns
+        previous = self._snapshot
+        current = {}
+
+        added = []
+        changed = []
+        for item in items:
+            key = item.get(self.key)
+            projection = tuple(item.get(column) for column in columns)
+
+            last = previous.get(key)
+            if last is None:
+                added.append(item)
+            elif last[0] != projection:
+                fields = tuple(
+                    column
+                    for column, old, new in zip(columns, last[0], projection)
+                    if old != new
+                )
+                changed.append((item, fields))
+
+            current[key] = (projection, item)
+
+        removed = [last[1] for key, last in previous.items() if key not in current]
+
+        self._snapshot = current
+        return Delta(added, removed, changed)
+
+
+def format_delta(delta: Delta, key: str = "id") -> typing.List[str]:
+    """Textify delta into lines, for batch mode."""
+    timestamp = time.strftime("%Y-%m-%dT%H:%M:%S")
+    lines = []
+    for item in delta.added:
+        lines.append(f"{timestamp} ADDED {item.get(key)}")
+    for item, fields in delta.changed:
+        values = ",".join(f"{field}={item.get(field)}" for field in fields)
+        lines.append(f"{timestamp} CHANGED {item.get(key)} {values}")
+    for item in delta.removed:
+        lines.append(f"{timestamp} REMOVED {item.get(key)}")
+    return lines
+
+
+class Snapshot(typing.NamedTuple):
+    """Last seen data of a cluster, loaded from cache."""
+
+    timestamp: float
+    metrics: dict
+    apps: typing.List[dict]
+
+
+def get_cache_filename(api_uri: str):
+    name = re.sub(r"[^\w.-]+", "_", api_uri)
+    return hdtop.config.get_cache_dirname() / (name + ".snapshot")
+
+
+def load_snapshot(api_uri: str) -> typing.Optional[Snapshot]:
+    """Load cached snapshot of the cluster. Returns None if not available."""
+    filename = get_cache_filename(api_uri)
+    try:
+        data = filename.read_bytes()
+    except OSError:
+        return None
+
+    if not data.startswith(CACHE_MAGIC):
+        return None
+
+    try:
+        payload = marshal.loads(zlib.decompress(data[len(CACHE_MAGIC) :]))
+        columns = payload["columns"]
+        apps = [dict(zip(columns, row)) for row in payload["rows"]]
+        return Snapshot(payload["timestamp"], payload["metrics"], apps)
+    except (zlib.error, ValueError, EOFError, TypeError, KeyError):
+        logger.warning("Broken snapshot cache: %s", filename)
+        return None
+
+
+def save_snapshot(
+    api_uri: str, metrics: dict, apps: typing.List[dict], columns: typing.List[str]
+):
+    """Save snapshot of the cluster. Apps are projected to the given columns.
+
+    File is written to a temporary file and then renamed, so concurrent
+    processes never see a partial file. Apps at the tail are dropped if the
+    file exceeds `cache.maxSize`.
+    """
+    columns = list(columns)
+    rows = [tuple(app.get(column) for column in columns) for app in apps]
+    max_size = hdtop.config.get_config("cache", "maxSize")
+
+    while True:
+        payload = {
+            "timestamp": time.time(),
+            "metrics": metrics or {},
+            "columns": columns,
+            "rows": rows,
+        }
+        try:
+            data = CACHE_MAGIC + zlib.compress(marshal.dumps(payload, 4))
+        except ValueError:  # unmarshallable value
+            logger.warning("Failed to serialize snapshot")
+            return
+        if len(data) <= max_size or not rows:
+            break
+        rows = rows[: len(rows) // 2]
+
+    filename = get_cache_filename(api_uri)
+    try:
+        filename.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmpname = tempfile.mkstemp(dir=filename.parent, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as fp:
+                fp.write(data)
+            os.replace(tmpname, filename)
+        except OSError:
+            os.unlink(tmpname)
+            raise
+    except OSError:
+        logger.exception("Failed to write snapshot cache")
+        return
+
+    prune_cache(filename.parent)
+
+
+def prune_cache(dirname):
+    """Keep at most CACHE_MAX_FILES snapshot files, drop least recently used."""
+    try:
+        files = sorted(
+            dirname.glob("*.snapshot"), key=lambda p: p.stat().st_mtime, reverse=True
+        )
+        for filename in files[CACHE_MAX_FILES:]:
+            filename.unlink()
+    except OSError:
+        pass
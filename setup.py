@@ -31,6 +31,7 @@ setup(
         "console_scripts": ["hdtop = hdtop.__main__:main"],
     },
     install_requires=["httpx", "urwid"],
+    extras_require={"kerberos": ["gssapi"]},
     classifiers=[
         "Development Status :: 2 - Pre-Alpha",
         "Environment :: Console",
@@ -0,0 +1,198 @@
+"""Alert rule compiler and engine
+"""
+import pytest
+
+import hdtop.alert
+import hdtop.config
+import hdtop.exception
+
+
+def evaluate(expression: str, item: dict) -> bool:
+    rule = hdtop.alert.Rule("test", "app", expression, 0.0, 0.0)
+    predicate = hdtop.alert.compile_rules([rule])
+    return predicate(item)[0]
+
+
+@pytest.mark.parametrize(
+    "string, seconds",
+    [("300", 300.0), (" 5m", 300.0), ("1.5h", 5400.0), ("2d", 172800.0)],
+)
+def test_parse_duration(string, seconds):
+    assert hdtop.alert.parse_duration(string) == seconds
+
+
+@pytest.mark.parametrize("string", ["soon", "5x", "m", ""])
+def test_parse_duration_invalid(string):
+    with pytest.raises(hdtop.exception.ConfigValueError):
+        hdtop.alert.parse_duration(string)
+
+
+@pytest.mark.parametrize(
+    "expression, item, expected",
+    [
+        ("containersPending > 100", {"containersPending": 101}, True),
+        ("containersPending > 100", {"containersPending": 100}, False),
+        ("containersPending > 100", {}, False),
+        ("containersPending < 1", {}, True),
+        ("state == RUNNING", {"state": "RUNNING"}, True),
+        ("state != 'RUNNING'", {"state": "ACCEPTED"}, True),
+        ('name == "a b"', {"name": "a b"}, True),
+        # units
+        ("elapsedTime > 6h", {"elapsedTime": 6 * 3600 * 1000 + 1}, True),
+        ("elapsedTime > 6h", {"elapsedTime": 6 * 3600 * 1000}, False),
+        ("elapsedTime >= 1.5m", {"elapsedTime": 90000}, True),
+        ("queueUsagePercentage >= 90%", {"queueUsagePercentage": 90.0}, True),
+        # conjunctions
+        ("a > 1 and b > 1", {"a": 2, "b": 1}, False),
+        ("a > 1 or b > 1", {"a": 2, "b": 1}, True),
+        ("not a > 1", {"a": 0}, True),
+        ("not (a > 1 or b > 1)", {"a": 0, "b": 2}, False),
+        ("(a > 1 or b > 1) and c == x", {"a": 2, "c": "x"}, True),
+        ("(a > 1 or b > 1) and c == x", {"a": 2, "c": "y"}, False),
+        # type mismatch
+        ("queue > 5", {"queue": "etl"}, False),
+        ("queue == 5", {"queue": "etl"}, False),
+        ("queue != 5", {"queue": "etl"}, True),
+        ("priority == 3", {"priority": "3"}, False),
+        ("priority == 3", {"priority": 3}, True),
+    ],
+)
+def test_compile_rules(expression, item, expected):
+    assert evaluate(expression, item) is expected
+
+
+@pytest.mark.parametrize(
+    "expression",
+    [
+        "",
+        "a",
+        "a >",
+        "> 1",
+        "a > 1 and",
+        "a > 1 b > 1",
+        "(a > 1",
+        "a > 1)",
+        "a > (1)",
+        "and > 1",
+        "a = 1",
+        "a > 1; import os",
+        "__import__('os') > 1",
+    ],
+)
+def test_translate_invalid(expression):
+    with pytest.raises(hdtop.exception.ConfigValueError):
+        hdtop.alert.translate(expression)
+
+
+def test_compile_rules_multiple():
+    rules = [
+        hdtop.alert.Rule("a", "app", "x > 1", 0.0, 0.0),
+        hdtop.alert.Rule("b", "app", "y == z", 0.0, 0.0),
+    ]
+    predicate = hdtop.alert.compile_rules(rules)
+    assert predicate({"x": 2, "y": "z"}) == (True, True)
+    assert predicate({"x": 1, "y": "w"}) == (False, False)
+    assert hdtop.alert.compile_rules([])({}) == ()
+
+
+def test_load_rules(tmp_path, monkeypatch):
+    monkeypatch.setenv("XDG_CONFIG_HOME", str(tmp_path))
+    filename = hdtop.config.get_config_filename()
+    filename.parent.mkdir(parents=True)
+    filename.write_text(
+        "[alert.pending-containers]\n"
+        "on = cluster            ; cluster / app / queue\n"
+        "when = containersPending > 100\n"
+        "for = 5m                ; condition should hold for 5 minutes\n"
+        "\n"
+        "[alert.queue-full]\n"
+        "on = queue\n"
+        "when = queueUsagePercentage >= 90%\n"
+        "clear = 1m\n"
+    )
+
+    assert hdtop.alert.load_rules() == [
+        hdtop.alert.Rule(
+            "pending-containers", "cluster", "containersPending > 100", 300.0, 0.0
+        ),
+        hdtop.alert.Rule(
+            "queue-full", "queue", "queueUsagePercentage >= 90%", 0.0, 60.0
+        ),
+    ]
+
+
+@pytest.mark.parametrize(
+    "section",
+    [
+        "[alert.x]\non = node\nwhen = a > 1\n",
+        "[alert.x]\non = app\n",
+        "[alert.x]\nwhen = a >\n",
+        "[alert.x]\nwhen = a > 1\nfor = soon\n",
+    ],
+)
+def test_load_rules_invalid(tmp_path, monkeypatch, section):
+    monkeypatch.setenv("XDG_CONFIG_HOME", str(tmp_path))
+    filename = hdtop.config.get_config_filename()
+    filename.parent.mkdir(parents=True)
+    filename.write_text(section)
+
+    with pytest.raises(hdtop.exception.ConfigValueError):
+        hdtop.alert.load_rules()
+
+
+def test_alert_engine_hold():
+    rule = hdtop.alert.Rule("busy", "cluster", "appsPending > 1", 10.0, 0.0)
+    engine = hdtop.alert.AlertEngine([rule])
+    busy = {"cluster": {"appsPending": 2}}
+
+    assert engine.evaluate("cluster", busy, now=100.0) == []
+    assert engine.evaluate("cluster", busy, now=109.0) == []
+
+    (transition,) = engine.evaluate("cluster", busy, now=110.0)
+    assert transition.firing
+    assert transition.alert == hdtop.alert.Alert("busy", "cluster", "cluster", 100.0)
+
+    # fires once
+    assert engine.evaluate("cluster", busy, now=120.0) == []
+    assert engine.firing_keys("cluster") == {"cluster"}
+
+
+def test_alert_engine_hold_interrupted():
+    rule = hdtop.alert.Rule("busy", "cluster", "appsPending > 1", 10.0, 0.0)
+    engine = hdtop.alert.AlertEngine([rule])
+    busy = {"cluster": {"appsPending": 2}}
+    idle = {"cluster": {"appsPending": 0}}
+
+    engine.evaluate("cluster", busy, now=100.0)
+    engine.evaluate("cluster", idle, now=105.0)
+    assert engine.evaluate("cluster", busy, now=110.0) == []
+    assert engine.evaluate("cluster", busy, now=119.0) == []
+    assert engine.evaluate("cluster", busy, now=120.0)[0].firing
+
+
+def test_alert_engine_clear():
+    rule = hdtop.alert.Rule("long", "app", "elapsedTime > 1h", 0.0, 60.0)
+    engine = hdtop.alert.AlertEngine([rule])
+    running = {"app_1": {"elapsedTime": 7200000}}
+
+    (transition,) = engine.evaluate("app", running, now=0.0)
+    assert transition.firing
+
+    # flapping back within `clear` keeps the alert
+    assert engine.evaluate("app", {}, now=10.0) == []
+    assert engine.evaluate("app", running, now=20.0) == []
+    assert engine.evaluate("app", {}, now=30.0) == []
+    assert engine.evaluate("app", {}, now=89.0) == []
+    assert engine.firing_keys("app") == {"app_1"}
+
+    (transition,) = engine.evaluate("app", {}, now=90.0)
+    assert not transition.firing
+    assert transition.alert.key == "app_1"
+    assert engine.firing_keys("app") == set()
+
+
+def test_alert_engine_type_mismatch():
+    rule = hdtop.alert.Rule("odd", "queue", "queue > 5", 0.0, 0.0)
+    engine = hdtop.alert.AlertEngine([rule])
+    apps = [{"id": "app_1", "queue": "etl", "allocatedMB": 1024}]
+    assert engine.evaluate_apps(apps) == []
@@ -0,0 +1,113 @@
+"""SPNEGO auth against a stand-in of RM's `AuthenticationFilter`
+"""
+import http.server
+import threading
+import time
+
+import httpx
+import pytest
+
+import hdtop.auth
+import hdtop.exception
+
+
+class StandInHandler(http.server.BaseHTTPRequestHandler):
+    """Accept a `hadoop.auth` cookie that is not expired, or a `Negotiate`
+    header; which is answered with a new cookie. Otherwise reply 401."""
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        stats = self.server.stats
+        stats["requests"] += 1
+
+        authorized = False
+        for cookie in self.headers.get("Cookie", "").split("; "):
+            if cookie.startswith(hdtop.auth.AUTH_COOKIE + "="):
+                value = cookie.partition("=")[2]
+                authorized = hdtop.auth.get_cookie_expire(value) > time.time()
+
+        set_cookie = None
+        if self.headers.get("Authorization", "").startswith("Negotiate "):
+            stats["negotiate"] += 1
+            authorized = True
+            expire = int((time.time() + self.server.cookie_life) * 1000)
+            set_cookie = (
+                f'{hdtop.auth.AUTH_COOKIE}="u=me&p=me@REALM&t=kerberos&e={expire}&s=sig"'
+                "; Path=/; HttpOnly"
+            )
+
+        if not authorized:
+            stats["challenge"] += 1
+            self.send_response(401)
+            self.send_header("WWW-Authenticate", "Negotiate")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        body = b'{"clusterMetrics": {}}'
+        self.send_response(200)
+        if set_cookie:
+            self.send_header("Set-Cookie", set_cookie)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+@pytest.fixture
+def server():
+    server = http.server.HTTPServer(("127.0.0.1", 0), StandInHandler)
+    server.stats = {"requests": 0, "challenge": 0, "negotiate": 0}
+    server.cookie_life = 3600
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def get_uri(server) -> str:
+    host, port = server.server_address
+    return f"http://{host}:{port}/ws/v1/cluster/metrics"
+
+
+def test_spnego_reuse_cookie(server):
+    auth = hdtop.auth.SpnegoAuth(token_provider=lambda host: b"token")
+    with httpx.Client(auth=auth) as client:
+        for _ in range(5):
+            client.get(get_uri(server)).raise_for_status()
+
+    assert server.stats == {"requests": 6, "challenge": 1, "negotiate": 1}
+
+
+def test_spnego_renew_before_expire(server):
+    server.cookie_life = hdtop.auth.SpnegoAuth.RENEW_MARGIN / 2
+
+    auth = hdtop.auth.SpnegoAuth(token_provider=lambda host: b"token")
+    with httpx.Client(auth=auth) as client:
+        for _ in range(3):
+            client.get(get_uri(server)).raise_for_status()
+
+    # only the first request is challenged; later ones negotiate proactively
+    assert server.stats == {"requests": 4, "challenge": 1, "negotiate": 3}
+
+
+def test_spnego_token_failure(server):
+    def token_provider(host):
+        raise RuntimeError("No Kerberos credentials available")
+
+    auth = hdtop.auth.SpnegoAuth(token_provider=token_provider)
+    with httpx.Client(auth=auth) as client:
+        with pytest.raises(httpx.HTTPError) as exc_info:
+            client.get(get_uri(server))
+
+    assert isinstance(exc_info.value, hdtop.exception.AuthenticationError)
+    assert "No Kerberos credentials available" in str(exc_info.value)
+
+
+def test_simple_auth(server):
+    auth = hdtop.auth.SimpleAuth("me")
+    request = next(auth.auth_flow(httpx.Request("GET", get_uri(server) + "?a=1")))
+    assert request.url.query == b"a=1&user.name=me"